@@ -30,6 +30,8 @@ os.environ['OPENAI_API_KEY']=os.getenv("OPENAI_API_KEY")
 os.environ['CO_API_KEY']=os.getenv("CO_API_KEY")
 VECTORDB_PATH = os.getenv("VECTORDB_PATH")
 
+from embedding_cache import cached_embeddings, get_embedding_cache
+
 app=FastAPI(
     title="Langchain Server",
     version="1.0",
@@ -39,7 +41,7 @@ app=FastAPI(
 @app.post("/vectordb/create")
 def create_vector_store():
     save_path = "faiss_index"
-    embeddings=OpenAIEmbeddings()
+    embeddings=cached_embeddings()
 
     loader=WebBaseLoader("https://docs.smith.langchain.com/") ## Data Ingestion
     docs=loader.load() ## Document Loading
@@ -52,6 +54,10 @@ def create_vector_store():
 
     return {"message": "Vector Store Created Successfully"}
 
+@app.get("/vectordb/embedding-cache/stats")
+def embedding_cache_stats():
+    return get_embedding_cache().stats()
+
 def load_vector_store(load_path):
     """Load FAISS vector store from disk if available, otherwise return None."""
 
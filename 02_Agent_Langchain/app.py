@@ -40,6 +40,8 @@ load_dotenv()
 os.environ['OPENAI_API_KEY']=os.getenv("OPENAI_API_KEY")
 VECTORDB_PATH = "faiss_index"
 
+from embedding_cache import cached_embeddings, get_embedding_cache
+
 logging.basicConfig(level=logging.INFO)
 
 app=FastAPI(
@@ -58,7 +60,7 @@ def create_vector_store(url: str = Body(..., embed=True)):
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
         final_documents = text_splitter.split_documents(docs[:50])
 
-        embeddings = OpenAIEmbeddings()
+        embeddings = cached_embeddings()
         vectors = FAISS.from_documents(final_documents, embeddings)
         vectors.save_local(VECTORDB_PATH)
 
@@ -67,6 +69,11 @@ def create_vector_store(url: str = Body(..., embed=True)):
         return {"error": str(e)}
 
 
+@app.get("/vectordb/embedding-cache/stats")
+def embedding_cache_stats():
+    return get_embedding_cache().stats()
+
+
 def load_vector_store():
     if os.path.exists(VECTORDB_PATH):
         return FAISS.load_local(VECTORDB_PATH, OpenAIEmbeddings(), allow_dangerous_deserialization=True)
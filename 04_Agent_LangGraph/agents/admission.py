@@ -0,0 +1,168 @@
+from typing import Dict, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_MODEL_IN_FLIGHT, ADMISSION_QUEUED
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+AGENT_MAX_CONCURRENT = int(os.getenv("AGENT_MAX_CONCURRENT", "32"))
+AGENT_MAX_QUEUED = int(os.getenv("AGENT_MAX_QUEUED", "64"))
+AGENT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AGENT_QUEUE_TIMEOUT_SECONDS", "30"))
+MODEL_MAX_CONCURRENT = int(os.getenv("MODEL_MAX_CONCURRENT", "16"))
+# Per-model overrides, e.g. "openai:gpt-4o-mini=32,groq:qwen-qwq-32b=4".
+MODEL_CONCURRENCY = dict(
+    (model.strip(), int(limit)) for model, limit in
+    (item.rsplit("=", 1) for item in os.getenv("MODEL_CONCURRENCY", "").split(",") if "=" in item)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Admission:
+    """A granted slot; `release()` is idempotent so streaming responses can call it from several places."""
+
+    def __init__(self, controller: "AdmissionController", session_id: str, model_config: str):
+        self._controller = controller
+        self.session_id = session_id
+        self.model_config = model_config
+        self.started_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    """
+    Admission control for agent turns, in this order:
+    a per-session lock (turns of one session run one at a time, in arrival order), a per-model
+    limit and a global limit of `max_concurrent` running turns. The model slot is taken first
+    so turns queued behind a saturated model hold no global slot. At most `max_queued` turns
+    may wait; beyond that, or after waiting `queue_timeout` seconds, a turn is rejected with
+    a Retry-After estimated from recent turn durations.
+    """
+
+    def __init__(self, max_concurrent: int = AGENT_MAX_CONCURRENT, max_queued: int = AGENT_MAX_QUEUED,
+                 queue_timeout: float = AGENT_QUEUE_TIMEOUT_SECONDS, model_limit: int = MODEL_MAX_CONCURRENT,
+                 model_limits: Dict[str, int] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.model_limit = model_limit
+        self.model_limits = model_limits if model_limits is not None else MODEL_CONCURRENCY
+        self._global = asyncio.Semaphore(max_concurrent)
+        self._models: Dict[str, asyncio.Semaphore] = {}
+        # session_id -> [lock, number of turns holding or waiting for it]
+        self._sessions: Dict[str, list] = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.model_in_flight: Dict[str, int] = {}
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._avg_seconds: Optional[float] = None
+
+    def _model_semaphore(self, model_config: str) -> asyncio.Semaphore:
+        if model_config not in self._models:
+            self._models[model_config] = asyncio.Semaphore(self.model_limits.get(model_config, self.model_limit))
+        return self._models[model_config]
+
+    def retry_after(self) -> int:
+        average = self._avg_seconds or 1.0
+        return max(1, math.ceil(average * (self.queued + 1) / self.max_concurrent))
+
+    def _reject(self, message: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(message, self.retry_after())
+
+    async def acquire(self, session_id: str, model_config: str) -> Admission:
+        if self.queued >= self.max_queued:
+            raise self._reject("Too many requests are waiting; try again later.")
+
+        entry = self._sessions.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.queued += 1
+        ADMISSION_QUEUED.inc()
+        acquired = []
+
+        async def acquire_all():
+            for lock in (entry[0], self._model_semaphore(model_config), self._global):
+                await lock.acquire()
+                acquired.append(lock)
+
+        try:
+            await asyncio.wait_for(acquire_all(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise self._reject(f"No capacity within {self.queue_timeout:.0f}s; try again later.")
+        finally:
+            self.queued -= 1
+            ADMISSION_QUEUED.dec()
+            if len(acquired) < 3:
+                for lock in acquired:
+                    lock.release()
+                self._leave_session(session_id)
+
+        self.in_flight += 1
+        self.admitted += 1
+        self.model_in_flight[model_config] = self.model_in_flight.get(model_config, 0) + 1
+        ADMISSION_IN_FLIGHT.inc()
+        ADMISSION_MODEL_IN_FLIGHT.labels(model_config).inc()
+        return Admission(self, session_id, model_config)
+
+    def _leave_session(self, session_id: str):
+        entry = self._sessions[session_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._sessions[session_id]
+
+    def _release(self, admission: Admission):
+        seconds = time.monotonic() - admission.started_at
+        self._avg_seconds = seconds if self._avg_seconds is None else 0.9 * self._avg_seconds + 0.1 * seconds
+        self.in_flight -= 1
+        self.model_in_flight[admission.model_config] -= 1
+        ADMISSION_IN_FLIGHT.dec()
+        ADMISSION_MODEL_IN_FLIGHT.labels(admission.model_config).dec()
+        self._global.release()
+        self._models[admission.model_config].release()
+        self._sessions[admission.session_id][0].release()
+        self._leave_session(admission.session_id)
+
+    @asynccontextmanager
+    async def admit(self, session_id: str, model_config: str):
+        admission = await self.acquire(session_id, model_config)
+        try:
+            yield admission
+        finally:
+            admission.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "model_in_flight": {model: count for model, count in self.model_in_flight.items() if count},
+            "active_sessions": len(self._sessions),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_turn_seconds": round(self._avg_seconds, 3) if self._avg_seconds is not None else None,
+        }
+
+
+admission_controller = AdmissionController()
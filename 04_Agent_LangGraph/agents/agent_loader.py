@@ -1,13 +1,68 @@
 from agents.graph_builder import GraphBuilder
+from collections import OrderedDict
+import threading
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-agent_instance = None
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "openai:gpt-4o-mini")
+SUPPORTED_MODEL_TYPES = ("openai", "groq")
+AGENT_REGISTRY_SIZE = max(1, int(os.getenv("AGENT_REGISTRY_SIZE", "4")))
+PREWARM_MODELS = [m.strip() for m in os.getenv("PREWARM_MODELS", "").split(",") if m.strip()]
 
-def preload_agent():
-    global agent_instance
+# model_config -> GraphBuilder, ordered from least to most recently used
+_agent_registry = OrderedDict()
+_registry_lock = threading.Lock()
+
+def validate_model_config(model_config: str):
+    model_type, sep, model_name = model_config.partition(":")
+    if not sep or not model_name or model_type not in SUPPORTED_MODEL_TYPES:
+        raise ValueError(
+            f"Unsupported model '{model_config}'. Expected '<type>:<name>' with type in {SUPPORTED_MODEL_TYPES}."
+        )
+
+def get_agent(model_config: str = DEFAULT_MODEL) -> GraphBuilder:
+    validate_model_config(model_config)
+
+    with _registry_lock:
+        agent = _agent_registry.get(model_config)
+        if agent is not None:
+            _agent_registry.move_to_end(model_config)
+            return agent
+
+    # Build outside the lock so a slow construction doesn't block lookups of cached models.
+    # The compiled graph and the tools are shared by all models, so only the LLM client is new.
+    logger.info("⚙️ Building GraphBuilder agent for model %s...", model_config)
+    agent = GraphBuilder(model_config=model_config)
+
+    with _registry_lock:
+        existing = _agent_registry.get(model_config)
+        if existing is not None:
+            _agent_registry.move_to_end(model_config)
+            return existing
+
+        _agent_registry[model_config] = agent
+        while len(_agent_registry) > AGENT_REGISTRY_SIZE:
+            evicted, _ = _agent_registry.popitem(last=False)
+            logger.info("♻️ Evicted agent for model %s from registry", evicted)
+
+    return agent
+
+def registered_models() -> list:
+    with _registry_lock:
+        return list(_agent_registry.keys())
+
+def preload_agent(model_configs: list = None):
     logger.info("⚙️ Preloading GraphBuilder agent...")
-    agent_instance = GraphBuilder()
+    agent = get_agent(DEFAULT_MODEL)
+
+    for model_config in model_configs if model_configs is not None else PREWARM_MODELS:
+        try:
+            get_agent(model_config)
+            logger.info("🔥 Prewarmed agent for model %s", model_config)
+        except Exception as e:
+            logger.exception("❌ Failed to prewarm agent for model %s: %s", model_config, e)
+
     logger.info("✅ Agent preloaded.")
-    return agent_instance
\ No newline at end of file
+    return agent
@@ -1,62 +1,128 @@
-from typing import Annotated, List
+from typing import Annotated, AsyncIterator, List, Tuple
 from typing import TypedDict
 import logging
-from collections import defaultdict
+import threading
 import time
 import os
+from uuid import uuid4
 from pathlib import Path
 from dotenv import load_dotenv
 
+from opentelemetry import trace
 from langchain_core.messages import AnyMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, START
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import tools_condition
 
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 from .tools import get_tools
+from .session_store import get_session_store
+from .history_window import HistoryWindow, SUMMARY_TAG
+from .tool_executor import ConcurrentToolNode
+from metrics import GRAPH_RUN_SECONDS, LLM_CALL_SECONDS, LLM_TOKENS
 
 env_path = Path(__file__).resolve().parents[1]/'.env'
 load_dotenv(dotenv_path=env_path)
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logger = logging.getLogger(__name__)
 logger.setLevel(getattr(logging, log_level, logging.INFO))
+tracer = trace.get_tracer(__name__)
 
-global_memory_store = defaultdict(InMemoryChatMessageHistory)
+# Key in `config["configurable"]` holding the GraphBuilder whose model runs the LLM node.
+AGENT_CONFIG_KEY = "agent"
+
+_graph = None
+_graph_with_memory = None
+_graph_lock = threading.Lock()
 
 class AgentState(TypedDict):
     messages: Annotated[List[AnyMessage], add_messages]
 
+def _bound_agent(config) -> "GraphBuilder":
+    return config["configurable"][AGENT_CONFIG_KEY]
+
+def _llm_tool_node(state: AgentState, config):
+    return _bound_agent(config)._llm_tool_node(state)
+
+async def _allm_tool_node(state: AgentState, config):
+    return await _bound_agent(config)._allm_tool_node(state)
+
+def _build_graph():
+    # All tool calls of one LLM step run concurrently under TOOL_STEP_DEADLINE_SECONDS.
+    tool_node = ConcurrentToolNode(get_tools())
+    builder = StateGraph(AgentState)
+    # Each node carries a sync and an async implementation so the same compiled
+    # graph serves both `invoke` and `ainvoke` without blocking the event loop.
+    builder.add_node("tool_calling_llm", RunnableLambda(_llm_tool_node, afunc=_allm_tool_node))
+
+    def tool_node_with_messages(state: AgentState, config):
+        with tracer.start_as_current_span("tools"):
+            result = tool_node.invoke(state, config)
+        new_messages = result.get("messages", [])
+        return {"messages": add_messages(state["messages"], new_messages)}
+
+    async def atool_node_with_messages(state: AgentState, config):
+        with tracer.start_as_current_span("tools"):
+            result = await tool_node.ainvoke(state, config)
+        new_messages = result.get("messages", [])
+        return {"messages": add_messages(state["messages"], new_messages)}
+
+    builder.add_node(
+        "tools",
+        RunnableLambda(tool_node_with_messages, afunc=atool_node_with_messages)
+    )
+    builder.add_edge(START, "tool_calling_llm")
+    builder.add_conditional_edges("tool_calling_llm", tools_condition)
+    builder.add_edge("tools", "tool_calling_llm")
+
+    return builder.compile()
+
+def _get_session_memory(session_id: str) -> BaseChatMessageHistory:
+    return get_session_store().get_history(session_id)
+
+def get_graph():
+    """
+    The agent graph, compiled once per process and shared by every model: the LLM node runs the
+    model of the GraphBuilder passed in the run config. Returns `(graph, graph_with_memory)`.
+    """
+    global _graph, _graph_with_memory
+    with _graph_lock:
+        if _graph is None:
+            graph = _build_graph()
+            graph_input_adapter = RunnableLambda(lambda x: {
+                "messages": add_messages(x["messages"], x["input"])
+            })
+            _graph_with_memory = RunnableWithMessageHistory(
+                graph_input_adapter | graph,
+                _get_session_memory,
+                input_messages_key="input",
+                history_messages_key="messages",
+                output_messages_key="messages"
+            )
+            _graph = graph
+        return _graph, _graph_with_memory
+
 class GraphBuilder:
+    """One model bound to the shared agent graph: its LLM client, tool binding and history window."""
+
     def __init__(self, model_config: str = "openai:gpt-4o-mini"):
         model_type, model_name = model_config.split(":")
+        self.model_config = model_config
         self.tools = get_tools()
-        self.llm = self._init_llm(model_type, model_name).bind_tools(tools=self.tools)
-        self.tool_node = ToolNode(self.tools)
-        self.graph = self._build_graph()
-
-        graph_input_adapter = RunnableLambda(lambda x: {
-            "messages": add_messages(x["messages"], x["input"])
-        })
-
-        self.graph_with_memory = RunnableWithMessageHistory(
-            graph_input_adapter | self.graph,
-            self._get_session_memory,
-            input_messages_key="input",
-            history_messages_key="messages"
-        )
-
-    @staticmethod
-    def _get_session_memory(session_id: str) -> InMemoryChatMessageHistory:
-        return global_memory_store[session_id]
+        self.base_llm = self._init_llm(model_type, model_name)
+        self.llm = self.base_llm.bind_tools(tools=self.tools)
+        self.history_window = HistoryWindow(model_name)
+        self.graph, self.graph_with_memory = get_graph()
 
     def _init_llm(self, model_type: str, model_name: str):
         return ChatGroq(model=model_name) if model_type == "groq" else ChatOpenAI(model=model_name)
 
-    def _llm_tool_node(self, state: AgentState):
+    @staticmethod
+    def _filter_messages(state: AgentState) -> List[AnyMessage]:
         raw_messages = state.get("messages", [])
         filtered_messages = [
             m for m in raw_messages
@@ -67,54 +133,158 @@ class GraphBuilder:
         if not filtered_messages:
             raise ValueError("LLM node received no valid messages after filtering.")
 
-        start = time.time()
-        response = self.llm.invoke(filtered_messages)
-        logger.info("⏱️ LLM invocation took %.2f seconds", time.time() - start)
+        return filtered_messages
+
+    def _record_llm_call(self, response: AIMessage, seconds: float, span):
+        logger.info("⏱️ LLM invocation took %.2f seconds", seconds)
+        LLM_CALL_SECONDS.labels(self.model_config).observe(seconds)
+        usage = getattr(response, "usage_metadata", None) or {}
+        LLM_TOKENS.labels(self.model_config, "input").inc(usage.get("input_tokens", 0))
+        LLM_TOKENS.labels(self.model_config, "output").inc(usage.get("output_tokens", 0))
+        span.set_attribute("llm.input_tokens", usage.get("input_tokens", 0))
+        span.set_attribute("llm.output_tokens", usage.get("output_tokens", 0))
+        span.set_attribute("llm.tool_calls", len(response.tool_calls))
+
+    def _llm_span(self, messages: List[AnyMessage]):
+        return tracer.start_as_current_span(
+            "tool_calling_llm", attributes={"llm.model": self.model_config, "llm.input_messages": len(messages)}
+        )
+
+    def _llm_tool_node(self, state: AgentState):
+        filtered_messages = self.history_window.apply(self._filter_messages(state), self.base_llm)
+
+        with self._llm_span(filtered_messages) as span:
+            start = time.time()
+            response = self.llm.invoke(filtered_messages)
+            self._record_llm_call(response, time.time() - start, span)
 
         return {"messages": [response]}
 
-    def _build_graph(self):
-        builder = StateGraph(AgentState)
-        builder.add_node("tool_calling_llm", self._llm_tool_node)
+    async def _allm_tool_node(self, state: AgentState):
+        filtered_messages = await self.history_window.aapply(self._filter_messages(state), self.base_llm)
 
-        def tool_node_with_messages(state: AgentState):
-            result = self.tool_node.invoke(state)
-            new_messages = result.get("messages", [])
-            return {"messages": add_messages(state["messages"], new_messages)}
+        with self._llm_span(filtered_messages) as span:
+            start = time.time()
+            response = await self.llm.ainvoke(filtered_messages)
+            self._record_llm_call(response, time.time() - start, span)
 
-        builder.add_node("tools", tool_node_with_messages)
-        builder.add_edge(START, "tool_calling_llm")
-        builder.add_conditional_edges("tool_calling_llm", tools_condition)
-        builder.add_edge("tools", "tool_calling_llm")
+        return {"messages": [response]}
 
-        return builder.compile()
+    def _config(self, **configurable) -> dict:
+        return {"configurable": {AGENT_CONFIG_KEY: self, **configurable}}
 
     def invoke(self, messages: List[AnyMessage]) -> dict:
-        return self.graph.invoke({"messages": messages})
+        return self.graph.invoke({"messages": messages}, config=self._config())
+
+    async def ainvoke(self, messages: List[AnyMessage]) -> dict:
+        return await self.graph.ainvoke({"messages": messages}, config=self._config())
+
+    @staticmethod
+    def _graph_input(messages: List[AnyMessage]) -> dict:
+        # The output state echoes the stored history, so every message needs a stable id
+        # for the session store to persist only what is new in this turn.
+        for message in messages:
+            if message.id is None:
+                message.id = str(uuid4())
+        # `messages` is filled in from the session store by RunnableWithMessageHistory.
+        return {"input": messages}
+
+    def _session_config(self, session_id: str) -> dict:
+        return self._config(session_id=session_id)
 
-    def invoke_and_parse(self, messages: List[AnyMessage], session_id: str) -> dict:
+    def invoke_and_parse(self, messages: List[AnyMessage], session_id: str,
+                         include_history: bool = False) -> dict:
         logger.debug("📨 Session %s has %d messages before invoking", session_id, len(messages))
 
         start = time.time()
         raw_response = self.graph_with_memory.invoke(
-            {
-                "input": messages,
-                "messages": self._get_session_memory(session_id).messages
-            },
-            config={"configurable": {"session_id": session_id}}
+            self._graph_input(messages),
+            config=self._session_config(session_id)
         )
         logger.info("🧠 Full graph invocation took %.2f seconds", time.time() - start)
+        GRAPH_RUN_SECONDS.labels(self.model_config, "invoke").observe(time.time() - start)
 
-        return self._parse_response(raw_response)
+        start_index = 0 if include_history else self._turn_start(raw_response, messages)
+        return self._parse_response(raw_response, start_index=start_index)
+
+    async def ainvoke_and_parse(self, messages: List[AnyMessage], session_id: str,
+                                include_history: bool = False) -> dict:
+        logger.debug("📨 Session %s has %d messages before invoking", session_id, len(messages))
+
+        start = time.time()
+        raw_response = await self.graph_with_memory.ainvoke(
+            self._graph_input(messages),
+            config=self._session_config(session_id)
+        )
+        logger.info("🧠 Full graph invocation took %.2f seconds", time.time() - start)
+        GRAPH_RUN_SECONDS.labels(self.model_config, "ainvoke").observe(time.time() - start)
 
-    def _parse_response(self, response: dict) -> dict:
+        start_index = 0 if include_history else self._turn_start(raw_response, messages)
+        return self._parse_response(raw_response, start_index=start_index)
+
+    async def astream_and_parse(self, messages: List[AnyMessage], session_id: str,
+                                include_history: bool = False) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Runs the graph like `ainvoke_and_parse` but yields `(event, payload)` pairs as it goes:
+        `token` for each LLM token, `tool_start`/`tool_end` around tool calls and a final
+        `final` event carrying the same payload `ainvoke_and_parse` returns.
+        """
+        start = time.time()
+        first_token_at = None
+
+        async for event in self.graph_with_memory.astream_events(
+            self._graph_input(messages),
+            config=self._session_config(session_id),
+            version="v2"
+        ):
+            kind = event["event"]
+
+            if kind == "on_chat_model_stream":
+                if SUMMARY_TAG in event.get("tags", []):
+                    continue
+                content = event["data"]["chunk"].content
+                if content:
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                        logger.info("⚡ First token after %.2f seconds", first_token_at - start)
+                    yield "token", {"content": content}
+
+            elif kind == "on_tool_start":
+                yield "tool_start", {"tool": event["name"], "input": event["data"].get("input")}
+
+            elif kind == "on_tool_end":
+                output = event["data"].get("output")
+                yield "tool_end", {"tool": event["name"], "output": str(getattr(output, "content", output))}
+
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                raw_response = event["data"]["output"]
+                logger.info("🧠 Full graph stream took %.2f seconds", time.time() - start)
+                GRAPH_RUN_SECONDS.labels(self.model_config, "stream").observe(time.time() - start)
+                start_index = 0 if include_history else self._turn_start(raw_response, messages)
+                yield "final", self._parse_response(raw_response, start_index=start_index)
+
+    @staticmethod
+    def _turn_start(response: dict, input_messages: List[AnyMessage]) -> int:
+        """Index in the returned state where this turn's input begins (the state also holds the session history)."""
         messages = response.get("messages", [])
+        if not input_messages:
+            return len(messages)
+        first_input_id = input_messages[0].id
+        # The current turn sits at the end of the state, so search backwards.
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == first_input_id:
+                return i
+        return 0
+
+    def _parse_response(self, response: dict, start_index: int = 0) -> dict:
+        messages = response.get("messages", [])[start_index:]
         logger.debug("🧩 Parsed messages: %s", messages)
 
         final_output = None
         tools_used = []
         retrieved_chunks = []
         intermediate_steps = []
+        tool_steps = []
 
         for msg in messages:
             if isinstance(msg, HumanMessage):
@@ -123,6 +293,7 @@ class GraphBuilder:
             elif isinstance(msg, AIMessage):
                 tool_calls = msg.additional_kwargs.get("tool_calls", [])
                 if tool_calls:
+                    tool_steps.append({"tools": [], "step_ms": None})
                     for call in tool_calls:
                         tool_name = call.get("function", {}).get("name")
                         args = call.get("function", {}).get("arguments")
@@ -141,11 +312,19 @@ class GraphBuilder:
                 content = msg.content
                 artifact = getattr(msg, "artifact", {})
 
+                timing = msg.response_metadata or {}
                 intermediate_steps.append({
                     "type": "tool_response",
                     "tool": tool_name,
-                    "content": content
+                    "content": content,
+                    "status": msg.status,
+                    "duration_ms": timing.get("duration_ms"),
                 })
+                if tool_steps:
+                    tool_steps[-1]["tools"].append({
+                        "tool": tool_name, "status": msg.status, "duration_ms": timing.get("duration_ms")
+                    })
+                    tool_steps[-1]["step_ms"] = timing.get("step_ms")
 
                 if isinstance(artifact, dict) and "results" in artifact:
                     for result in artifact["results"]:
@@ -162,4 +341,5 @@ class GraphBuilder:
             "tools_used": tools_used,
             "retrieved_chunks": retrieved_chunks,
             "intermediate_steps": intermediate_steps,
+            "tool_steps": tool_steps,
         }
\ No newline at end of file
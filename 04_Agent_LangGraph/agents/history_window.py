@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import json
+import logging
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+import tiktoken
+from langchain_core.messages import AnyMessage, AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+STALE_TOOL_OUTPUT_TOKENS = int(os.getenv("STALE_TOOL_OUTPUT_TOKENS", "200"))
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+
+logger = logging.getLogger(__name__)
+
+# Tag on summarization calls so streaming endpoints can leave their tokens out.
+SUMMARY_TAG = "history_summary"
+
+# Rough per-message framing overhead of chat APIs (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an AI assistant.
+Keep facts, names, numbers, user preferences, decisions and open questions. Drop small talk. Be concise.
+
+Current summary:
+{summary}
+
+New messages to fold in:
+{transcript}
+
+Updated summary:"""
+
+
+class HistoryWindow:
+    """
+    Fits session history into a token budget before each LLM call.
+
+    The last `keep_turns` turns (a turn starts at a HumanMessage) are always sent verbatim.
+    Older turns have their tool outputs truncated and, if the history is still over budget,
+    the oldest turns are folded into a rolling summary. Summaries are cached by the id of the
+    last folded message, so one is only recomputed when the window moves forward.
+    """
+
+    def __init__(self, model_name: str, token_budget: int = HISTORY_TOKEN_BUDGET,
+                 keep_turns: int = HISTORY_KEEP_TURNS, tool_output_tokens: int = STALE_TOOL_OUTPUT_TOKENS):
+        self.token_budget = token_budget
+        self.keep_turns = max(1, keep_turns)
+        self.tool_output_tokens = tool_output_tokens
+        try:
+            self.encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self._summaries = OrderedDict()
+        self._token_counts = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.token_budget > 0
+
+    def count_tokens(self, message: AnyMessage) -> int:
+        key = (message.id, len(str(message.content)))
+        if message.id is not None and key in self._token_counts:
+            self._token_counts.move_to_end(key)
+            return self._token_counts[key]
+
+        text = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+        tokens = len(self.encoding.encode(text)) + MESSAGE_OVERHEAD_TOKENS
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += len(self.encoding.encode(json.dumps(message.tool_calls, default=str)))
+
+        if message.id is not None:
+            self._token_counts[key] = tokens
+            if len(self._token_counts) > SUMMARY_CACHE_SIZE * 16:
+                self._token_counts.popitem(last=False)
+        return tokens
+
+    def _truncate_tool_output(self, message: AnyMessage) -> AnyMessage:
+        if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+            return message
+        tokens = self.encoding.encode(message.content)
+        if len(tokens) <= self.tool_output_tokens:
+            return message
+        truncated = self.encoding.decode(tokens[:self.tool_output_tokens]) + " …[truncated]"
+        return message.model_copy(update={"content": truncated})
+
+    @staticmethod
+    def _split_turns(messages: List[AnyMessage]) -> List[List[AnyMessage]]:
+        turns = []
+        for message in messages:
+            if isinstance(message, HumanMessage) or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def _plan(self, messages: List[AnyMessage]) -> Tuple[List[AnyMessage], List[AnyMessage]]:
+        """Returns (messages to fold into the summary, messages to send verbatim)."""
+        turns = self._split_turns(messages)
+        recent = [m for turn in turns[-self.keep_turns:] for m in turn]
+        older_turns = [[self._truncate_tool_output(m) for m in turn] for turn in turns[:-self.keep_turns]]
+
+        budget = self.token_budget - sum(self.count_tokens(m) for m in recent)
+        older_tokens = [sum(self.count_tokens(m) for m in turn) for turn in older_turns]
+
+        # Fold the oldest turns until the remaining ones fit into what the recent turns left over.
+        fold = 0
+        remaining = sum(older_tokens)
+        while fold < len(older_turns) and remaining > budget:
+            remaining -= older_tokens[fold]
+            fold += 1
+
+        folded = [m for turn in older_turns[:fold] for m in turn]
+        kept = [m for turn in older_turns[fold:] for m in turn]
+        return folded, kept + recent
+
+    def _cached_prefix(self, folded: List[AnyMessage]) -> Tuple[Optional[str], List[AnyMessage]]:
+        """Finds the longest already-summarized prefix of `folded`; returns its summary and the rest."""
+        for i in range(len(folded) - 1, -1, -1):
+            summary = self._summaries.get(folded[i].id)
+            if summary is not None:
+                self._summaries.move_to_end(folded[i].id)
+                return summary, folded[i + 1:]
+        return None, folded
+
+    def _remember(self, folded: List[AnyMessage], summary: str):
+        if folded[-1].id is None:
+            return
+        self._summaries[folded[-1].id] = summary
+        while len(self._summaries) > SUMMARY_CACHE_SIZE:
+            self._summaries.popitem(last=False)
+
+    @staticmethod
+    def _transcript(messages: List[AnyMessage]) -> str:
+        lines = []
+        for m in messages:
+            if isinstance(m, AIMessage) and m.tool_calls:
+                calls = ", ".join(f"{c['name']}({json.dumps(c['args'], default=str)})" for c in m.tool_calls)
+                lines.append(f"assistant called tools: {calls}")
+            if m.content:
+                role = {"human": "user", "ai": "assistant"}.get(m.type, m.type)
+                lines.append(f"{role}: {m.content}")
+        return "\n".join(lines)
+
+    def _summary_prompt(self, summary: Optional[str], new_messages: List[AnyMessage]) -> str:
+        return SUMMARY_PROMPT.format(summary=summary or "(none)", transcript=self._transcript(new_messages))
+
+    @staticmethod
+    def _with_summary(summary: str, kept: List[AnyMessage]) -> List[AnyMessage]:
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + kept
+
+    def apply(self, messages: List[AnyMessage], llm) -> List[AnyMessage]:
+        if not self.enabled:
+            return messages
+        folded, kept = self._plan(messages)
+        if not folded:
+            return kept
+
+        summary, pending = self._cached_prefix(folded)
+        if pending:
+            logger.info("📝 Folding %d messages into the rolling summary", len(pending))
+            summary = llm.invoke(self._summary_prompt(summary, pending), config={"tags": [SUMMARY_TAG]}).content
+            self._remember(folded, summary)
+        return self._with_summary(summary, kept)
+
+    async def aapply(self, messages: List[AnyMessage], llm) -> List[AnyMessage]:
+        if not self.enabled:
+            return messages
+        folded, kept = self._plan(messages)
+        if not folded:
+            return kept
+
+        summary, pending = self._cached_prefix(folded)
+        if pending:
+            logger.info("📝 Folding %d messages into the rolling summary", len(pending))
+            summary = (await llm.ainvoke(
+                self._summary_prompt(summary, pending), config={"tags": [SUMMARY_TAG]}
+            )).content
+            self._remember(folded, summary)
+        return self._with_summary(summary, kept)
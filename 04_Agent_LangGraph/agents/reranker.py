@@ -0,0 +1,127 @@
+from typing import List, Optional
+from collections import Counter
+import logging
+import math
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+from opentelemetry import trace
+from llama_index.core.postprocessor import LLMRerank
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from ingestion.bm25_index import tokenize
+from metrics import RERANK_SECONDS, observe
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+RERANKER = os.getenv("RERANKER", "fusion")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "5"))
+RERANK_LEXICAL_WEIGHT = float(os.getenv("RERANK_LEXICAL_WEIGHT", "0.4"))
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+def _min_max(scores: List[float]) -> List[float]:
+    low, high = min(scores), max(scores)
+    if high - low < 1e-12:
+        return [1.0 if high > 0 else 0.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+class ScoreFusionReranker(BaseNodePostprocessor):
+    """
+    CPU-local reranker: fuses BM25 over the candidate set with the retriever's score
+    (vector similarity, or the fused rank of the hybrid retriever).
+
+    Both scores are min-max normalized across the candidates and mixed with `lexical_weight`,
+    so exact term matches (ids, names, error codes) that embeddings blur are pulled up.
+    """
+
+    top_n: int = RERANK_TOP_N
+    lexical_weight: float = RERANK_LEXICAL_WEIGHT
+    k1: float = 1.2
+    b: float = 0.75
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ScoreFusionReranker"
+
+    def _bm25_scores(self, query_terms: List[str], documents: List[List[str]]) -> List[float]:
+        n = len(documents)
+        avg_len = sum(len(doc) for doc in documents) / n or 1.0
+        doc_freq = Counter(term for doc in documents for term in set(doc))
+        idf = {term: math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5)) for term in set(query_terms)}
+
+        scores = []
+        for doc in documents:
+            tf = Counter(doc)
+            norm = self.k1 * (1 - self.b + self.b * len(doc) / avg_len)
+            scores.append(sum(
+                idf[term] * tf[term] * (self.k1 + 1) / (tf[term] + norm)
+                for term in idf if tf[term]
+            ))
+        return scores
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        if query_bundle is None or not nodes:
+            return nodes[:self.top_n]
+
+        lexical = _min_max(self._bm25_scores(
+            tokenize(query_bundle.query_str),
+            [tokenize(node.node.get_content()) for node in nodes],
+        ))
+        semantic = _min_max([node.score or 0.0 for node in nodes])
+        for node, lex, sem in zip(nodes, lexical, semantic):
+            node.score = self.lexical_weight * lex + (1 - self.lexical_weight) * sem
+        return sorted(nodes, key=lambda node: node.score, reverse=True)[:self.top_n]
+
+
+class TimedReranker(BaseNodePostprocessor):
+    """Records the latency of the wrapped reranker as a `rerank` span and in `rag_rerank_duration_seconds`."""
+
+    inner: BaseNodePostprocessor
+    kind: str
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "TimedReranker"
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        with tracer.start_as_current_span("rerank", attributes={"rerank.kind": self.kind, "rerank.candidates": len(nodes)}) as span, \
+                observe(RERANK_SECONDS, reranker=self.kind):
+            results = self.inner.postprocess_nodes(nodes, query_bundle=query_bundle)
+            span.set_attribute("rerank.kept", len(results))
+            return results
+
+
+def _build(kind: str, top_n: int, llm) -> Optional[BaseNodePostprocessor]:
+    if kind == "fusion":
+        return ScoreFusionReranker(top_n=top_n)
+    if kind == "cross_encoder":
+        from llama_index.core.postprocessor import SentenceTransformerRerank
+        return SentenceTransformerRerank(model=RERANK_MODEL, top_n=top_n)
+    if kind == "llm":
+        if llm is None:
+            from llama_index.llms.openai import OpenAI
+            llm = OpenAI(model="gpt-4o-mini")
+        return LLMRerank(top_n=top_n, llm=llm, choice_batch_size=RERANK_CANDIDATES)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unsupported reranker: {kind}")
+
+
+def build_reranker(kind: str = None, top_n: int = None, llm=None) -> Optional[BaseNodePostprocessor]:
+    """
+    Returns the node postprocessor that trims the RERANK_CANDIDATES retrieved chunks to `top_n`.
+    `kind` (env RERANKER) is `fusion`, `cross_encoder` (sentence-transformers, scored in one batch),
+    `llm` (LLMRerank, one extra LLM call per query) or `none`.
+    """
+    kind = (kind or RERANKER).lower()
+    top_n = top_n or RERANK_TOP_N
+    logger.info("🎯 Reranker: %s (top %d of %d candidates)", kind, top_n, RERANK_CANDIDATES)
+
+    reranker = _build(kind, top_n, llm)
+    return TimedReranker(inner=reranker, kind=kind) if reranker is not None else None
@@ -0,0 +1,138 @@
+from typing import Any, List, Optional
+from collections import OrderedDict
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+import numpy as np
+from metrics import CACHE_REQUESTS
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+# Cosine similarity above which a differently worded query reuses a cached result; 0 disables it.
+RETRIEVAL_CACHE_SIMILARITY = float(os.getenv("RETRIEVAL_CACHE_SIMILARITY", "0"))
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def normalize_query(query: str) -> str:
+    return " ".join(_TOKEN_RE.findall(query.lower()))
+
+
+class RetrievalCache:
+    """
+    TTL + LRU cache of `vector_retriever` results, keyed by normalized query text.
+
+    With a `similarity_threshold`, a query that misses by text can still hit an entry whose
+    query embedding is at least that similar. Every entry belongs to an index version;
+    `invalidate(version)` (registered with `index_handle.on_change`) drops all of them, and
+    results computed against an older version are not stored. `misses` counts the
+    retrievals that actually ran, i.e. every `put`.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl_seconds: float = RETRIEVAL_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = RETRIEVAL_CACHE_SIMILARITY, version: int = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version = version
+        # key -> (value, normalized query embedding or None, expires_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _live(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] < now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, query: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live(normalize_query(query), time.time())
+            if entry is None:
+                return None
+            self.hits += 1
+            CACHE_REQUESTS.labels("retrieval", "hit").inc()
+            return entry[0]
+
+    def get_similar(self, embedding: List[float]) -> Optional[Any]:
+        if not self.similarity_threshold:
+            return None
+        query = _unit(embedding)
+        now = time.time()
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for key, (_, cached, expires_at) in self._entries.items():
+                if cached is None or expires_at < now:
+                    continue
+                score = float(np.dot(query, cached))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.semantic_hits += 1
+            CACHE_REQUESTS.labels("retrieval", "semantic_hit").inc()
+            return self._entries[best_key][0]
+
+    def put(self, query: str, value: Any, version: int, embedding: List[float] = None):
+        CACHE_REQUESTS.labels("retrieval", "miss").inc()
+        with self._lock:
+            self.misses += 1
+            if version != self.version:
+                return
+            key = normalize_query(query)
+            self._entries[key] = (value, _unit(embedding) if embedding is not None else None, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version: int):
+        with self._lock:
+            self.version = version
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+                logger.info("🧹 Retrieval cache cleared for index version %d", version)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+            "index_version": self.version,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _unit(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
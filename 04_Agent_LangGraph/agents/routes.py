@@ -1,17 +1,39 @@
 from fastapi import APIRouter, Body, HTTPException
+from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 from langchain_core.messages import HumanMessage
 import agents.agent_loader as loader 
+from agents.session_store import get_session_store
+from agents.tools import get_retrieval_cache
+from agents.tool_guard import tool_stats
+from agents.admission import admission_controller, AdmissionRejected
+from metrics import ERRORS
+import asyncio
+import json
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/agent/invoke")
-async def run_agent(inputs: dict = Body(...)):
+_TRUE_VALUES = {"true", "1", "yes", "on"}
+_FALSE_VALUES = {"false", "0", "no", "off", ""}
+
+def _parse_bool(value, field: str) -> bool:
+    # bool("false") is True, so strings from form-style clients are parsed explicitly.
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _TRUE_VALUES | _FALSE_VALUES:
+        return value.strip().lower() in _TRUE_VALUES
+    raise HTTPException(status_code=400, detail=f"Field '{field}' must be a boolean.")
+
+def _parse_agent_request(inputs: dict):
     user_input = inputs.get("input", "")
-    model_config = inputs.get("model", "openai:gpt-4o-mini")
+    model_config = inputs.get("model", loader.DEFAULT_MODEL)
     session_id = inputs.get("session_id", "default")
+    include_history = _parse_bool(inputs.get("include_history", False), "include_history")
 
     if isinstance(user_input, dict):
         user_input = user_input.get("input", "")
@@ -19,18 +41,99 @@ async def run_agent(inputs: dict = Body(...)):
     if not isinstance(user_input, str) or not user_input.strip():
         raise HTTPException(status_code=400, detail="Field 'input' must be a non-empty string.")
 
-    if loader.agent_instance is None:
-        logger.error("❌ Agent instance not initialized.")
+    try:
+        loader.validate_model_config(model_config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return user_input, model_config, session_id, include_history
+
+async def _get_agent(model_config: str):
+    try:
+        return await asyncio.to_thread(loader.get_agent, model_config)
+    except Exception:
+        logger.exception("❌ Agent for model %s could not be initialized.", model_config)
         raise HTTPException(status_code=500, detail="Agent not ready.")
 
+async def _admit(session_id: str, model_config: str):
+    try:
+        return await admission_controller.acquire(session_id, model_config)
+    except AdmissionRejected as e:
+        logger.warning("🚦 Rejected turn for session %s (%s): %s", session_id, model_config, e)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@router.post("/agent/invoke")
+async def run_agent(inputs: dict = Body(...)):
+    user_input, model_config, session_id, include_history = _parse_agent_request(inputs)
+    agent = await _get_agent(model_config)
+
     messages = [HumanMessage(content=user_input)]
     logger.info("💬 Session %s | Model: %s | Input: %s", session_id, model_config, user_input)
 
+    admission = await _admit(session_id, model_config)
     try:
         start = time.time()
-        result = loader.agent_instance.invoke_and_parse(messages, session_id=session_id)
+        result = await agent.ainvoke_and_parse(
+            messages, session_id=session_id, include_history=include_history
+        )
         logger.info("✅ Agent response completed in %.2fs", time.time() - start)
         return result
     except Exception as e:
         logger.exception("❌ Agent execution failed for session: %s", session_id)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        ERRORS.labels("agent").inc()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        admission.release()
+
+@router.post("/agent/stream")
+async def stream_agent(inputs: dict = Body(...)):
+    user_input, model_config, session_id, include_history = _parse_agent_request(inputs)
+    agent = await _get_agent(model_config)
+
+    messages = [HumanMessage(content=user_input)]
+    logger.info("💬 [stream] Session %s | Model: %s | Input: %s", session_id, model_config, user_input)
+
+    # Admitted before the response starts so a rejection is still a plain 429.
+    admission = await _admit(session_id, model_config)
+
+    async def event_generator():
+        start = time.time()
+        try:
+            async for event, payload in agent.astream_and_parse(
+                messages, session_id=session_id, include_history=include_history
+            ):
+                yield {"event": event, "data": json.dumps(payload, default=str)}
+            logger.info("✅ Agent stream completed in %.2fs", time.time() - start)
+        except Exception as e:
+            logger.exception("❌ Agent stream failed for session: %s", session_id)
+            ERRORS.labels("agent").inc()
+            yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+        finally:
+            admission.release()
+
+    # The background task covers clients that disconnect before the stream starts.
+    return EventSourceResponse(event_generator(), background=BackgroundTask(admission.release))
+
+@router.get("/agent/sessions/stats")
+def session_stats():
+    return get_session_store().stats()
+
+@router.get("/agent/admission/stats")
+def admission_stats():
+    return admission_controller.stats()
+
+@router.get("/agent/retrieval-cache/stats")
+def retrieval_cache_stats():
+    cache = get_retrieval_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/agent/tools/stats")
+def external_tool_stats():
+    return tool_stats()
+
+@router.delete("/agent/sessions/{session_id}")
+def delete_session(session_id: str):
+    get_session_store().delete(session_id)
+    return {"message": f"Deleted session {session_id}"}
@@ -0,0 +1,268 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Sequence
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+from pydantic import PrivateAttr
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "./data/sessions.db")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+
+logger = logging.getLogger(__name__)
+
+_session_store = None
+
+
+class SessionChatMessageHistory(InMemoryChatMessageHistory):
+    """In-memory history that ignores messages it already holds (matched by message id)."""
+
+    _ids: set = PrivateAttr(default_factory=set)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        for message in messages:
+            if message.id is not None:
+                if message.id in self._ids:
+                    continue
+                self._ids.add(message.id)
+            self.messages.append(message)
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.add_messages(messages)
+
+    def clear(self) -> None:
+        super().clear()
+        self._ids.clear()
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """History view over one session in a SQLiteSessionStore; appends only unseen message ids."""
+
+    def __init__(self, store: "SQLiteSessionStore", session_id: str):
+        self.store = store
+        self.session_id = session_id
+        # Ids loaded or written through this view. The state handed back after a turn repeats the
+        # whole history, so only messages outside this set are serialized and written.
+        self._known_ids = set()
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        messages = self.store._load_messages(self.session_id)
+        self._known_ids.update(m.id for m in messages if m.id is not None)
+        return messages
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        new_messages = [m for m in messages if m.id is None or m.id not in self._known_ids]
+        self.store._append_messages(self.session_id, new_messages)
+        self._known_ids.update(m.id for m in new_messages if m.id is not None)
+
+    def clear(self) -> None:
+        self.store.delete(self.session_id)
+
+
+class SessionStore(ABC):
+    """Bounded store of per-session chat histories with TTL and LRU eviction."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> BaseChatMessageHistory:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl_seconds: float = SESSION_TTL_SECONDS):
+        super().__init__(max_sessions, ttl_seconds)
+        # session_id -> (history, last_access), ordered from least to most recently used
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        # Entries are kept in access order, so expired sessions are always at the front.
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+            logger.debug("♻️ Evicted session %s", session_id)
+
+    def get_history(self, session_id: str) -> SessionChatMessageHistory:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            history = entry[0] if entry and now - entry[1] <= self.ttl_seconds else SessionChatMessageHistory()
+            self._sessions[session_id] = (history, now)
+            self._evict(now)
+            return history
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            histories = [history for history, _ in self._sessions.values()]
+        messages = sum(len(h.messages) for h in histories)
+        content_bytes = sum(len(str(m.content).encode("utf-8")) for h in histories for m in h.messages)
+        return {
+            "backend": "memory",
+            "sessions": len(histories),
+            "messages": messages,
+            "content_bytes": content_bytes,
+            "evictions": self.evictions,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a SQLite file, shared across restarts and uvicorn workers.
+    Each turn inserts only messages whose id is not yet stored for the session.
+    """
+
+    def __init__(self, db_path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX,
+                 ttl_seconds: float = SESSION_TTL_SECONDS):
+        super().__init__(max_sessions, ttl_seconds)
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(last_access);
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+                    message_id TEXT,
+                    payload TEXT NOT NULL,
+                    UNIQUE(session_id, message_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, seq);
+            """)
+
+    def _evict(self, now: float):
+        cursor = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,))
+        evicted = cursor.rowcount
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            " SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+        evicted += cursor.rowcount
+        if evicted:
+            self.evictions += evicted
+            logger.debug("♻️ Evicted %d sessions", evicted)
+
+    def get_history(self, session_id: str) -> SQLiteChatMessageHistory:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._evict(now)
+                self._conn.execute(
+                    "INSERT INTO sessions(session_id, last_access) VALUES (?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                    (session_id, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return SQLiteChatMessageHistory(self, session_id)
+
+    def _load_messages(self, session_id: str) -> List[BaseMessage]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return messages_from_dict([json.loads(payload) for (payload,) in rows])
+
+    def _append_messages(self, session_id: str, messages: Sequence[BaseMessage]):
+        rows = [
+            (session_id, m.id, json.dumps(message_to_dict(m), default=str))
+            for m in messages
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO sessions(session_id, last_access) VALUES (?, ?)",
+                    (session_id, time.time())
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages(session_id, message_id, payload) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages, content_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM messages"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "messages": messages,
+            "content_bytes": content_bytes,
+            "db_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            "evictions": self.evictions,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def build_session_store() -> SessionStore:
+    if SESSION_STORE == "sqlite":
+        logger.info("🗄️ Using SQLite session store at %s", SESSION_DB_PATH)
+        return SQLiteSessionStore(SESSION_DB_PATH)
+    if SESSION_STORE != "memory":
+        raise ValueError(f"Unsupported SESSION_STORE '{SESSION_STORE}'. Use 'memory' or 'sqlite'.")
+    return InMemorySessionStore()
+
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        _session_store = build_session_store()
+    return _session_store
@@ -0,0 +1,162 @@
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+from opentelemetry import trace
+from langchain_core.messages import AIMessage, ToolMessage
+from metrics import ERRORS, TOOL_CALL_SECONDS, TOOL_STEP_SECONDS
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+TOOL_STEP_DEADLINE_SECONDS = float(os.getenv("TOOL_STEP_DEADLINE_SECONDS", "30"))
+TOOL_STEP_WORKERS = int(os.getenv("TOOL_STEP_WORKERS", "16"))
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Shared by all agents; a call that overruns its step deadline keeps its worker until it returns.
+_executor = ThreadPoolExecutor(max_workers=TOOL_STEP_WORKERS, thread_name_prefix="tool-step")
+
+
+class ConcurrentToolNode:
+    """
+    Runs all tool calls of one AIMessage concurrently and waits at most `deadline` seconds.
+
+    Calls that fail or miss the deadline are answered with an error ToolMessage so the LLM
+    can still use the partial results. Every ToolMessage carries its own `duration_ms` and the
+    step's `step_ms` in `response_metadata`.
+    """
+
+    def __init__(self, tools, deadline: float = TOOL_STEP_DEADLINE_SECONDS):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.deadline = deadline
+
+    @staticmethod
+    def _tool_calls(state) -> List[dict]:
+        messages = state.get("messages", [])
+        last = messages[-1] if messages else None
+        if not isinstance(last, AIMessage):
+            raise ValueError("Tools node expects the last message to be an AIMessage.")
+        return last.tool_calls
+
+    @staticmethod
+    def _error_message(call: dict, content: str) -> ToolMessage:
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error")
+
+    def _to_message(self, call: dict, output, error: Optional[BaseException]) -> ToolMessage:
+        if error is not None:
+            return self._error_message(call, f"Error: {error!r}\nPlease fix your mistakes.")
+        if isinstance(output, ToolMessage):
+            return output
+        return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+
+    def _timed_out(self, call: dict) -> ToolMessage:
+        logger.warning("⏰ Tool %s missed the %.0fs step deadline", call["name"], self.deadline)
+        return self._error_message(call, f"Tool '{call['name']}' did not finish within {self.deadline:.0f}s; answer without it.")
+
+    def _unknown(self, call: dict) -> ToolMessage:
+        return self._error_message(
+            call, f"Error: {call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}]."
+        )
+
+    @staticmethod
+    def _tool_span(call: dict):
+        return tracer.start_as_current_span("tool_call", attributes={"tool.name": call["name"]})
+
+    @staticmethod
+    def _traced(span, output):
+        span.set_attribute("tool.status", getattr(output, "status", "success"))
+        return output
+
+    def _finish(self, messages: List[ToolMessage], durations: List[Optional[float]], start: float) -> dict:
+        step_seconds = time.perf_counter() - start
+        step_ms = round(step_seconds * 1000, 1)
+        TOOL_STEP_SECONDS.observe(step_seconds)
+        span = trace.get_current_span()
+        span.set_attribute("tools.calls", len(messages))
+        span.set_attribute("tools.errors", sum(1 for message in messages if message.status == "error"))
+        for message, duration in zip(messages, durations):
+            TOOL_CALL_SECONDS.labels(message.name, message.status).observe(duration if duration is not None else step_seconds)
+            if message.status == "error":
+                ERRORS.labels("tool").inc()
+            message.response_metadata = {
+                **message.response_metadata,
+                "duration_ms": round(duration * 1000, 1) if duration is not None else None,
+                "step_ms": step_ms,
+            }
+        logger.info("🛠️ Ran %d tool call(s) in %.0f ms", len(messages), step_ms)
+        return {"messages": messages}
+
+    def invoke(self, state, config=None) -> dict:
+        calls = self._tool_calls(state)
+        start = time.perf_counter()
+        durations = [None] * len(calls)
+
+        def run(i, tool, call):
+            call_start = time.perf_counter()
+            with self._tool_span(call) as span:
+                try:
+                    return self._traced(span, tool.invoke({**call, "type": "tool_call"}, config))
+                finally:
+                    durations[i] = time.perf_counter() - call_start
+
+        futures = {}
+        for i, call in enumerate(calls):
+            tool = self.tools_by_name.get(call["name"])
+            if tool is not None:
+                # copy_context keeps callbacks/tracing of the current run attached to the worker thread.
+                futures[i] = _executor.submit(copy_context().run, run, i, tool, call)
+        wait(futures.values(), timeout=self.deadline)
+
+        messages = []
+        for i, call in enumerate(calls):
+            future = futures.get(i)
+            if future is None:
+                messages.append(self._unknown(call))
+            elif not future.done():
+                future.cancel()
+                messages.append(self._timed_out(call))
+            else:
+                error = future.exception()
+                messages.append(self._to_message(call, None if error else future.result(), error))
+        return self._finish(messages, durations, start)
+
+    async def ainvoke(self, state, config=None) -> dict:
+        calls = self._tool_calls(state)
+        start = time.perf_counter()
+        durations = [None] * len(calls)
+
+        async def run(i, tool, call):
+            call_start = time.perf_counter()
+            with self._tool_span(call) as span:
+                try:
+                    return self._traced(span, await tool.ainvoke({**call, "type": "tool_call"}, config))
+                finally:
+                    durations[i] = time.perf_counter() - call_start
+
+        tasks = {}
+        for i, call in enumerate(calls):
+            tool = self.tools_by_name.get(call["name"])
+            if tool is not None:
+                tasks[i] = asyncio.create_task(run(i, tool, call))
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=self.deadline)
+
+        messages = []
+        for i, call in enumerate(calls):
+            task = tasks.get(i)
+            if task is None:
+                messages.append(self._unknown(call))
+            elif not task.done():
+                task.cancel()
+                messages.append(self._timed_out(call))
+            else:
+                error = task.exception()
+                messages.append(self._to_message(call, None if error else task.result(), error))
+        return self._finish(messages, durations, start)
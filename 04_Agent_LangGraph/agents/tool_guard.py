@@ -0,0 +1,355 @@
+from typing import Any, Dict, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+import numpy as np
+from langchain_core.tools import BaseTool, ToolException
+
+from .retrieval_cache import normalize_query
+from metrics import CACHE_REQUESTS
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH", "./data/tool_cache.db")
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "86400"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "10000"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "10"))
+# Per-tool overrides, e.g. "arxiv=20,wikipedia=5".
+TOOL_TIMEOUTS = dict(
+    (name.strip(), float(seconds)) for name, seconds in
+    (item.split("=") for item in os.getenv("TOOL_TIMEOUTS", "").split(",") if "=" in item)
+)
+TOOL_BREAKER_FAILURES = int(os.getenv("TOOL_BREAKER_FAILURES", "5"))
+TOOL_BREAKER_RESET_SECONDS = float(os.getenv("TOOL_BREAKER_RESET_SECONDS", "60"))
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", "16"))
+
+logger = logging.getLogger(__name__)
+
+_tool_cache = None
+_guarded_tools: Dict[str, "GuardedTool"] = {}
+# Runs blocking tool calls so they can be abandoned after their timeout.
+_executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+
+
+# Providers whose wrappers report failures as a normal result instead of raising.
+ERROR_RESULT_PREFIXES = ("Arxiv exception:",)
+
+
+def provider_error(tool: BaseTool, content: Any, artifact: Any) -> Optional[str]:
+    """The error a wrapped tool returned as its answer, if any."""
+    if tool.response_format == "content_and_artifact" and not artifact:
+        # TavilySearchResults catches every exception and returns (repr(e), {}).
+        return str(content)
+    if isinstance(content, str) and content.startswith(ERROR_RESULT_PREFIXES):
+        return content
+    return None
+
+
+def tool_cache_key(tool_name: str, tool_input: Any) -> str:
+    if isinstance(tool_input, dict):
+        normalized = {k: normalize_query(v) if isinstance(v, str) else v for k, v in sorted(tool_input.items())}
+    else:
+        normalized = normalize_query(str(tool_input))
+    payload = json.dumps([tool_name, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """On-disk TTL cache of external tool results, keyed by tool name and normalized input."""
+
+    def __init__(self, path: str = TOOL_CACHE_PATH, ttl_seconds: float = TOOL_CACHE_TTL_SECONDS,
+                 max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tool_results (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_results_expires_at ON tool_results(expires_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM tool_results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, tool_name: str, result: Any):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?, ?)",
+                (key, tool_name, json.dumps(result, default=str), now + self.ttl_seconds)
+            )
+            self._conn.execute("DELETE FROM tool_results WHERE expires_at <= ?", (now,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM tool_results WHERE key IN (SELECT key FROM tool_results ORDER BY expires_at LIMIT ?)",
+                    (overflow,)
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "db_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_seconds`;
+    then lets one trial call through (half-open) and closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = TOOL_BREAKER_FAILURES, reset_seconds: float = TOOL_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """Ends a half-open trial that was abandoned without an outcome; the next call becomes the trial."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ToolMetrics:
+    """Call counters and latency percentiles (over the last `window` provider calls) of one tool."""
+
+    def __init__(self, window: int = 1000):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.short_circuits = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float = None, cache_hit: bool = False, error: bool = False,
+               timeout: bool = False, short_circuit: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.cache_hits += cache_hit
+            self.errors += error
+            self.timeouts += timeout
+            self.short_circuits += short_circuit
+            if seconds is not None:
+                self._latencies.append(seconds * 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "hit_rate": round(self.cache_hits / self.calls, 4) if self.calls else None,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "short_circuits": self.short_circuits,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+        }
+
+
+class GuardedTool(BaseTool):
+    """
+    Wraps an external tool with a result cache, a timeout and a circuit breaker.
+    Failures, including errors the provider returns as a normal answer, are raised as
+    `ToolException`, which the agent receives as the tool's answer; they are never cached.
+    The wrapped tool's `response_format` is kept, so artifacts (e.g. Tavily's raw results) pass through.
+    """
+
+    inner: BaseTool
+    timeout: float = TOOL_TIMEOUT_SECONDS
+    cache: Optional[Any] = None
+    breaker: Any = None
+    metrics: Any = None
+    handle_tool_error: bool = True
+
+    @staticmethod
+    def _tool_input(args, kwargs):
+        return kwargs if kwargs else args[0]
+
+    def _lookup(self, tool_input):
+        if self.cache is None:
+            return None, None
+        key = tool_cache_key(self.name, tool_input)
+        cached = self.cache.get(key)
+        CACHE_REQUESTS.labels("tool", "hit" if cached is not None else "miss").inc()
+        if cached is not None and self.response_format == "content_and_artifact":
+            # Stored as a JSON list; the tool contract needs a (content, artifact) tuple.
+            cached = tuple(cached)
+        return key, cached
+
+    def _tool_call(self, tool_input) -> dict:
+        # Invoked with a ToolCall, the wrapped tool answers with a ToolMessage, which carries its artifact.
+        args = tool_input if isinstance(tool_input, dict) else {next(iter(self.inner.args)): tool_input}
+        return {"name": self.inner.name, "args": args, "id": f"guarded-{self.name}", "type": "tool_call"}
+
+    def _result(self, message):
+        content, artifact = message.content, getattr(message, "artifact", None)
+        error = provider_error(self.inner, content, artifact)
+        if error is None and message.status == "error":
+            error = str(content)
+        if error is not None:
+            raise RuntimeError(error)
+        return (content, artifact) if self.response_format == "content_and_artifact" else content
+
+    def _before_call(self):
+        if not self.breaker.allow():
+            self.metrics.record(short_circuit=True)
+            raise ToolException(f"{self.name} is temporarily unavailable after repeated failures.")
+
+    def _failed(self, start: float, error: Exception, timeout: bool = False):
+        self.breaker.record_failure()
+        self.metrics.record(time.perf_counter() - start, error=not timeout, timeout=timeout)
+        if self.breaker.state == "open":
+            logger.warning("🔌 Circuit breaker for %s is open", self.name)
+        if timeout:
+            return ToolException(f"{self.name} did not answer within {self.timeout:.0f}s.")
+        return ToolException(f"{self.name} failed: {error}")
+
+    def _succeeded(self, start: float, key: Optional[str], result: Any):
+        self.breaker.record_success()
+        self.metrics.record(time.perf_counter() - start)
+        if key is not None:
+            self.cache.put(key, self.name, result)
+
+    def _run(self, *args, run_manager=None, **kwargs):
+        tool_input = self._tool_input(args, kwargs)
+        key, cached = self._lookup(tool_input)
+        if cached is not None:
+            self.metrics.record(cache_hit=True)
+            return cached
+
+        self._before_call()
+        start = time.perf_counter()
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        future = _executor.submit(self.inner.invoke, self._tool_call(tool_input), config)
+        try:
+            result = self._result(future.result(timeout=self.timeout))
+        except FutureTimeout as e:
+            # The worker thread is abandoned; it finishes (or hangs) without blocking the agent.
+            raise self._failed(start, e, timeout=True)
+        except Exception as e:
+            raise self._failed(start, e)
+        self._succeeded(start, key, result)
+        return result
+
+    async def _arun(self, *args, run_manager=None, **kwargs):
+        tool_input = self._tool_input(args, kwargs)
+        key, cached = self._lookup(tool_input)
+        if cached is not None:
+            self.metrics.record(cache_hit=True)
+            return cached
+
+        self._before_call()
+        start = time.perf_counter()
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        try:
+            message = await asyncio.wait_for(self.inner.ainvoke(self._tool_call(tool_input), config), timeout=self.timeout)
+            result = self._result(message)
+        except asyncio.TimeoutError as e:
+            raise self._failed(start, e, timeout=True)
+        except asyncio.CancelledError:
+            # Cancelled by the step deadline or a client disconnect: a half-open trial must not stay taken.
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            raise self._failed(start, e)
+        self._succeeded(start, key, result)
+        return result
+
+
+def get_tool_cache() -> Optional[ToolResultCache]:
+    global _tool_cache
+    if _tool_cache is None and TOOL_CACHE_PATH:
+        _tool_cache = ToolResultCache(TOOL_CACHE_PATH)
+        logger.info("🗃️ Tool result cache at %s", TOOL_CACHE_PATH)
+    return _tool_cache
+
+
+def guard_tool(tool: BaseTool, timeout: float = None, cache: Optional[ToolResultCache] = None) -> GuardedTool:
+    """Wraps `tool`; the timeout defaults to its TOOL_TIMEOUTS entry or TOOL_TIMEOUT_SECONDS."""
+    guarded = GuardedTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        response_format=tool.response_format,
+        inner=tool,
+        timeout=timeout or TOOL_TIMEOUTS.get(tool.name, TOOL_TIMEOUT_SECONDS),
+        cache=cache if cache is not None else get_tool_cache(),
+        breaker=CircuitBreaker(),
+        metrics=ToolMetrics(),
+    )
+    _guarded_tools[tool.name] = guarded
+    return guarded
+
+
+def tool_stats() -> dict:
+    cache = get_tool_cache()
+    return {
+        "tools": {
+            name: {**tool.metrics.stats(), "breaker": tool.breaker.state, "timeout_seconds": tool.timeout}
+            for name, tool in _guarded_tools.items()
+        },
+        "cache": {"enabled": True, **cache.stats()} if cache else {"enabled": False},
+    }
@@ -2,42 +2,207 @@ from langchain_community.tools import WikipediaQueryRun, ArxivQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper, ArxivAPIWrapper
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain.agents import Tool
-from llama_index.core.postprocessor import LLMRerank
-from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.llms.openai import OpenAI
+from opentelemetry import trace
+from llama_index.core import Settings
 from llama_index.core.query_engine import RetrieverQueryEngine
-from ingestion.index_builder import load_index
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import QueryBundle
+from ingestion.index_builder import index_handle, get_bm25_index
+from ingestion.hybrid_retriever import HybridRetriever, RETRIEVAL_MODE, RETRIEVAL_EMBED_TIMEOUT_SECONDS
+from .reranker import build_reranker, RERANK_CANDIDATES, RERANK_TOP_N
+from .retrieval_cache import RetrievalCache, RETRIEVAL_CACHE_SIZE
+from .tool_guard import guard_tool
 
+import asyncio
 import logging
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+# `chunks`: the tool returns the reranked chunks and the agent LLM answers from them directly.
+# `synthesize`: the tool runs its own response synthesis LLM call over the chunks.
+RETRIEVER_TOOL_MODE = os.getenv("RETRIEVER_TOOL_MODE", "chunks")
+
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
 _cached_tools = None 
 
+NO_INDEX_MESSAGE = "No documents have been indexed yet."
+
+# Query engine over the live index snapshot; rebuilt when ingestion swaps in a new one.
+_query_engine = None
+_query_engine_index = None
+_reranker = None
+_reranker_built = False
+
+_retrieval_cache = None
+
+def get_reranker():
+    # Built once: a cross-encoder loads its model on construction.
+    global _reranker, _reranker_built
+    if not _reranker_built:
+        _reranker = build_reranker()
+        _reranker_built = True
+    return _reranker
+
+def _build_query_engine(index):
+    # A wide candidate set is retrieved and the reranker trims it to RERANK_TOP_N.
+    reranker = get_reranker()
+    top_k = RERANK_CANDIDATES if reranker is not None else RERANK_TOP_N
+    vector_retriever = VectorIndexRetriever(index=index, similarity_top_k=top_k)
+    # Dense and BM25 rankings are fused (RETRIEVAL_MODE=hybrid) before reranking.
+    retriever = HybridRetriever(vector_retriever, get_bm25_index(), index.docstore, top_k=top_k)
+    return RetrieverQueryEngine.from_args(
+        retriever,
+        node_postprocessors=[reranker] if reranker is not None else None
+    )
+
+def get_query_engine():
+    """Returns `(query_engine, version)`, the engine over the live index and that index's version."""
+    global _query_engine, _query_engine_index
+    index, version = index_handle.current()
+    if index is None:
+        return None, version
+    if index is not _query_engine_index:
+        _query_engine = _build_query_engine(index)
+        _query_engine_index = index
+        logger.info("🔁 Retriever now reads index version %d", version)
+    return _query_engine, version
+
+def get_retrieval_cache():
+    global _retrieval_cache
+    if _retrieval_cache is None and RETRIEVAL_CACHE_SIZE > 0:
+        _retrieval_cache = RetrievalCache(version=index_handle.version)
+        # Ingestion changes what the retriever would return, so every index change empties the cache.
+        index_handle.on_change(_retrieval_cache.invalidate)
+    return _retrieval_cache
+
+def _no_index_result():
+    return (NO_INDEX_MESSAGE, {"results": []}) if RETRIEVER_TOOL_MODE == "chunks" else NO_INDEX_MESSAGE
+
+def _chunk_source(metadata: dict):
+    return metadata.get("file_name") or metadata.get("url") or metadata.get("source")
+
+def _format_chunks(nodes):
+    """Tool output for `chunks` mode: text for the agent LLM plus a `{"results": [...]}` artifact."""
+    results = [
+        {
+            "text": node.node.get_content(),
+            "score": round(node.score, 3) if node.score is not None else None,
+            "source": _chunk_source(node.node.metadata),
+            "metadata": node.node.metadata,
+        }
+        for node in nodes
+    ]
+    content = "\n\n".join(
+        f"[{i}] (source: {result['source']}, score: {result['score']})\n{result['text']}"
+        for i, result in enumerate(results, 1)
+    )
+    return content or "No matching documents found.", {"results": results}
+
+def _synthesize_span(nodes):
+    return tracer.start_as_current_span("synthesize", attributes={"synthesis.chunks": len(nodes)})
+
+def _run_query(query_engine, bundle: QueryBundle):
+    # retrieve() applies the reranker; `chunks` mode skips the synthesis LLM call.
+    nodes = query_engine.retrieve(bundle)
+    if RETRIEVER_TOOL_MODE == "chunks":
+        return _format_chunks(nodes)
+    with _synthesize_span(nodes):
+        return query_engine.synthesize(bundle, nodes)
+
+async def _arun_query(query_engine, bundle: QueryBundle):
+    nodes = await query_engine.aretrieve(bundle)
+    if RETRIEVER_TOOL_MODE == "chunks":
+        return _format_chunks(nodes)
+    with _synthesize_span(nodes):
+        return await query_engine.asynthesize(bundle, nodes)
+
+def _semantic_lookup(cache) -> bool:
+    # Lexical retrieval never embeds the query, so neither does the cache lookup.
+    return bool(cache.similarity_threshold) and RETRIEVAL_MODE != "lexical"
+
+def _embedding_failed(error: Exception):
+    # The retriever embeds again on its own (and falls back to BM25 in hybrid mode).
+    logger.warning("⚠️ Query embedding for the semantic cache lookup failed, skipping it: %r", error)
+
+def query_documents(query: str):
+    query_engine, version = get_query_engine()
+    if query_engine is None:
+        return _no_index_result()
+    cache = get_retrieval_cache()
+    if cache is None:
+        return _run_query(query_engine, QueryBundle(query))
+
+    result = cache.get(query)
+    if result is not None:
+        return result
+    bundle = QueryBundle(query)
+    if _semantic_lookup(cache):
+        # The query embedding is computed once and reused by the retriever on a miss.
+        try:
+            bundle.embedding = Settings.embed_model.get_query_embedding(query)
+        except Exception as e:
+            _embedding_failed(e)
+        else:
+            result = cache.get_similar(bundle.embedding)
+            if result is not None:
+                return result
+
+    result = _run_query(query_engine, bundle)
+    cache.put(query, result, version, bundle.embedding)
+    return result
+
+async def aquery_documents(query: str):
+    query_engine, version = get_query_engine()
+    if query_engine is None:
+        return _no_index_result()
+    cache = get_retrieval_cache()
+    if cache is None:
+        return await _arun_query(query_engine, QueryBundle(query))
+
+    result = cache.get(query)
+    if result is not None:
+        return result
+    bundle = QueryBundle(query)
+    if _semantic_lookup(cache):
+        try:
+            bundle.embedding = await asyncio.wait_for(
+                Settings.embed_model.aget_query_embedding(query),
+                timeout=RETRIEVAL_EMBED_TIMEOUT_SECONDS or None
+            )
+        except Exception as e:
+            _embedding_failed(e)
+        else:
+            result = cache.get_similar(bundle.embedding)
+            if result is not None:
+                return result
+
+    result = await _arun_query(query_engine, bundle)
+    cache.put(query, result, version, bundle.embedding)
+    return result
+
 def build_tools():
     tools = []
 
-    tools.append(WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(top_k_results=1, doc_content_chars_max=200)))
-    tools.append(ArxivQueryRun(api_wrapper=ArxivAPIWrapper(top_k_results=1, doc_content_chars_max=200)))
-    tools.append(TavilySearchResults())
-
-    index = load_index()
-    if index:
-        llm = OpenAI(model="gpt-4o-mini")
-        reranker = LLMRerank(top_n=5, llm=llm)
-
-        retriever = VectorIndexRetriever(
-            index=index,
-            similarity_top_k=5, 
-            postprocessors=[reranker]
-        )
-        query_engine = RetrieverQueryEngine.from_args(retriever)
-
-        retriever_tool = Tool(
-            name="vector_retriever",
-            func=query_engine.query, 
-            description="Useful for answering questions from uploaded documents, websites, or SQL databases such as FAQs, company data, policies, etc."
-        )
-        tools.append(retriever_tool)
+    # External providers get a result cache, a timeout and a circuit breaker.
+    tools.append(guard_tool(WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(top_k_results=1, doc_content_chars_max=200))))
+    tools.append(guard_tool(ArxivQueryRun(api_wrapper=ArxivAPIWrapper(top_k_results=1, doc_content_chars_max=200))))
+    tools.append(guard_tool(TavilySearchResults()))
+
+    # Always registered: the retriever reads whatever index version is current at call time,
+    # so documents ingested after startup are visible without rebuilding the tools.
+    retriever_tool = Tool(
+        name="vector_retriever",
+        func=query_documents,
+        coroutine=aquery_documents,
+        response_format="content_and_artifact" if RETRIEVER_TOOL_MODE == "chunks" else "content",
+        description="Useful for answering questions from uploaded documents, websites, or SQL databases such as FAQs, company data, policies, etc."
+    )
+    tools.append(retriever_tool)
 
     for tool in tools:
         logger.info("🔌 Tool loaded: %s", getattr(tool, 'name', type(tool)))
@@ -48,4 +213,4 @@ def get_tools():
     global _cached_tools
     if _cached_tools is None:
         _cached_tools = build_tools()
-    return _cached_tools
\ No newline at end of file
+    return _cached_tools
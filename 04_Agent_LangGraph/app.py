@@ -1,15 +1,19 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from contextlib import asynccontextmanager
 from ingestion.routes import router as ingestion_router
 from agents.routes import router as agent_router
-from ingestion import create_index
+from ingestion import create_index, index_handle, get_bm25_index
+from ingestion.jobs import job_queue
+from ingestion.sources import shutdown_load_pool
 
 import os
 import time
 from dotenv import load_dotenv
 import logging
 from logging_config import setup_logging
-from agents.agent_loader import preload_agent 
+from agents.agent_loader import preload_agent, registered_models
+from metrics import HTTP_REQUEST_SECONDS, render_metrics
+from tracing import setup_tracing
 
 load_dotenv()
 setup_logging()
@@ -48,26 +52,50 @@ async def lifespan(app: FastAPI):
         else:
             logger.info(f"✅ Indexed sources at startup: {', '.join(sources_ingested)}")
 
+    try:
+        if index_handle.get() is not None:
+            logger.info("📦 Vector index loaded (version %d).", index_handle.version)
+            # Loaded (or rebuilt from the stored chunks) here rather than under the index lock on the first query.
+            get_bm25_index()
+    except Exception as e:
+        logger.exception("❌ Failed to load vector index: %s", e)
+
     try:
         preload_agent()
-        logger.info("🧠 Preloaded GraphBuilder agent at startup.")
+        logger.info("🧠 Preloaded GraphBuilder agents at startup: %s", ", ".join(registered_models()))
     except Exception as e:
         logger.exception("❌ Failed to preload agent at startup: %s", e)
 
     yield
 
+    job_queue.shutdown()
+    shutdown_load_pool()
+    if tracer_provider is not None:
+        tracer_provider.shutdown()
     logger.info("🔚 Application shutdown complete.")
 
 app = FastAPI(title="LangGraph Agent API", version="1.0", lifespan=lifespan)
+# Spans from the HTTP request down to LLM calls, tools, retrieval and ingestion stages (TRACING_EXPORTER).
+tracer_provider = setup_tracing(app)
 
 app.include_router(ingestion_router, prefix="/vectordb")
 app.include_router(agent_router, prefix="")
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.middleware("http")
 async def log_request_time(request: Request, call_next):
     start = time.time()
     response = await call_next(request)
     duration = time.time() - start
+    # Label by route template (e.g. /vectordb/jobs/{job_id}) to keep the number of series bounded.
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), str(response.status_code)
+    ).observe(duration)
     logger.info("%s %s took %.2fs", request.method, request.url.path, duration)
     logger.debug("📥 Request received: %s %s", request.method, request.url)
     return response
@@ -0,0 +1,2 @@
+# Offline benchmarks for the LangGraph agent.
+# Run from the 04_Agent_LangGraph folder, e.g. `python -m benchmarks.bench_concurrency`.
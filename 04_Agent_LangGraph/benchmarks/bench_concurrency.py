@@ -0,0 +1,67 @@
+"""
+Compares agent throughput under N concurrent sessions when the graph runs through the
+blocking `invoke_and_parse` path versus the non-blocking `ainvoke_and_parse` path.
+
+Both paths are driven from a single event loop, the same way a uvicorn worker runs
+`run_agent`, with the LLM replaced by a fake that sleeps for a fixed latency.
+
+    python -m benchmarks.bench_concurrency --sessions 1 10 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+
+from langchain_core.messages import HumanMessage
+
+from agents.graph_builder import GraphBuilder
+from benchmarks.fakes import FakeChatModel
+
+
+def build_agent(latency: float) -> GraphBuilder:
+    with patch("agents.graph_builder.get_tools", return_value=[]), \
+            patch.object(GraphBuilder, "_init_llm", lambda self, t, n: FakeChatModel(latency=latency)):
+        return GraphBuilder()
+
+
+async def run_blocking(agent: GraphBuilder, sessions: int, tag: str):
+    async def one(i):
+        return agent.invoke_and_parse([HumanMessage(content="hello")], session_id=f"{tag}-{i}")
+
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+
+
+async def run_async(agent: GraphBuilder, sessions: int, tag: str):
+    await asyncio.gather(*(
+        agent.ainvoke_and_parse([HumanMessage(content="hello")], session_id=f"{tag}-{i}")
+        for i in range(sessions)
+    ))
+
+
+def measure(runner, agent: GraphBuilder, sessions: int, tag: str) -> float:
+    start = time.perf_counter()
+    asyncio.run(runner(agent, sessions, tag))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 25, 50])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    agent = build_agent(args.latency)
+
+    print(f"{'sessions':>8} | {'blocking s':>10} | {'blocking req/s':>14} | {'async s':>8} | {'async req/s':>11} | {'speedup':>7}")
+    print("-" * 75)
+    for n in args.sessions:
+        blocking = measure(run_blocking, agent, n, f"blocking-{n}")
+        non_blocking = measure(run_async, agent, n, f"async-{n}")
+        print(
+            f"{n:>8} | {blocking:>10.2f} | {n / blocking:>14.1f} | "
+            f"{non_blocking:>8.2f} | {n / non_blocking:>11.1f} | {blocking / non_blocking:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+End-to-end load test of the FastAPI app, fully offline: the chat models, the LlamaIndex
+embedding model and LLM, and the Wikipedia/Arxiv/Tavily tools are replaced by the local
+fakes in `benchmarks.fakes`, and requests go to the app in-process through httpx's ASGI
+transport. Each scenario is run at every concurrency level and reports throughput,
+p50/p95/p99 latency and the process's memory growth.
+
+    python -m benchmarks.bench_load --scenarios invoke create upload --concurrency 1 8 32 --requests 200
+
+Scenarios:
+  invoke  POST /agent/invoke; the fake LLM calls `--tools` in one step, then answers
+  create  POST /vectordb/create on a fresh folder of `--docs-per-job` documents, until the job is done
+  upload  POST /vectordb/upload of one new document, until the job is done
+
+Everything (index, manifest, caches, sessions) lives in a temporary directory. tiktoken's
+`cl100k_base` file must already be in its cache (TIKTOKEN_CACHE_DIR) when running without network.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import psutil
+
+WORDS = (
+    "refund policy invoice account password reset shipping order delivery warranty "
+    "return support contact billing plan upgrade cancel subscription payment card error"
+).split()
+JOB_DONE = ("succeeded", "failed", "cancelled")
+
+
+def write_document(path: Path, rng: random.Random, words: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(" ".join(rng.choice(WORDS) for _ in range(words)), encoding="utf-8")
+
+
+def configure_environment(workdir: Path, args):
+    """Points every path of the app into `workdir`; must run before the app is imported."""
+    rng = random.Random(args.seed)
+    for i in range(args.startup_docs):
+        write_document(workdir / "docs" / f"doc-{i}.txt", rng, args.words)
+
+    os.environ.update({
+        "OPENAI_API_KEY": "offline",
+        "GROQ_API_KEY": "offline",
+        "TAVILY_API_KEY": "offline",
+        "VECTORDB_PATH": str(workdir / "index"),
+        "INGEST_MANIFEST_PATH": str(workdir / "ingest_manifest.json"),
+        "DEFAULT_DOCS_FOLDER": str(workdir / "docs"),
+        "UPLOADED_DOCS_FOLDER": str(workdir / "uploads"),
+        "SQL_DB_PATH": str(workdir / "missing.db"),  # keep the FAQ database from .env out of the startup index
+        "EMBEDDING_CACHE_PATH": str(workdir / "embedding_cache.db"),
+        "TOOL_CACHE_PATH": "",
+        "RETRIEVAL_CACHE_SIZE": "0",
+        "SESSION_STORE": "memory",
+        "DEFAULT_MODEL": "openai:gpt-4o-mini",
+        "PREWARM_MODELS": "",
+        "RERANKER": "fusion",
+        "TRACING_EXPORTER": "none",
+        "AGENT_MAX_CONCURRENT": str(args.max_concurrent),
+        "INGEST_MAX_QUEUED_JOBS": str(max(args.concurrency) * 2),
+    })
+
+
+def install_fakes(args):
+    """Swaps every network-bound dependency for a fake with the configured latency."""
+    from llama_index.core import Settings
+    from llama_index.core.llms import MockLLM
+    from agents.graph_builder import GraphBuilder
+    from benchmarks.fakes import FakeChatModel, FakeEmbedding, FakeSearchTool
+
+    Settings.embed_model = FakeEmbedding(latency=args.embed_latency)
+    Settings.llm = MockLLM()
+
+    def fake_tool(name):
+        return lambda *a, **kw: FakeSearchTool(name=name, latency=args.tool_latency)
+
+    patchers = [
+        patch.object(GraphBuilder, "_init_llm", lambda self, t, n: FakeChatModel(latency=args.llm_latency, tool_calls=args.tools)),
+        patch("agents.tools.WikipediaAPIWrapper", lambda **kw: None),
+        patch("agents.tools.ArxivAPIWrapper", lambda **kw: None),
+        patch("agents.tools.WikipediaQueryRun", fake_tool("wikipedia")),
+        patch("agents.tools.ArxivQueryRun", fake_tool("arxiv")),
+        patch("agents.tools.TavilySearchResults", fake_tool("tavily_search_results_json")),
+    ]
+    for patcher in patchers:
+        patcher.start()
+
+
+async def wait_for_job(client, job_id: str) -> str:
+    while True:
+        job = (await client.get(f"/vectordb/jobs/{job_id}")).json()
+        if job["status"] in JOB_DONE:
+            return job["status"]
+        await asyncio.sleep(0.02)
+
+
+def make_scenario(name: str, workdir: Path, args):
+    rng = random.Random(args.seed)
+
+    async def invoke(client, i):
+        session = f"bench-{i % args.sessions}" if args.sessions else f"bench-{i}"
+        response = await client.post("/agent/invoke", json={"input": f"What is the refund policy? ({i})", "session_id": session})
+        return str(response.status_code)
+
+    async def create(client, i):
+        folder = workdir / "create" / f"{time.monotonic_ns()}-{i}"
+        for j in range(args.docs_per_job):
+            write_document(folder / f"doc-{j}.txt", rng, args.words)
+        response = await client.post("/vectordb/create", json={"source_type": "docs", "source_path": str(folder)})
+        if response.status_code != 200:
+            return str(response.status_code)
+        return await wait_for_job(client, response.json()["job_id"])
+
+    async def upload(client, i):
+        text = " ".join(rng.choice(WORDS) for _ in range(args.words))
+        files = {"file": (f"upload-{time.monotonic_ns()}-{i}.txt", text.encode("utf-8"), "text/plain")}
+        response = await client.post("/vectordb/upload", files=files)
+        if response.status_code != 200:
+            return str(response.status_code)
+        return await wait_for_job(client, response.json()["job_id"])
+
+    return {"invoke": invoke, "create": create, "upload": upload}[name]
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+async def run_load(client, request, concurrency: int, total: int) -> dict:
+    latencies, outcomes = [], Counter()
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                outcome = await request(client, i)
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] += 1
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    ok = outcomes["200"] + outcomes["succeeded"]
+    return {
+        "requests": total,
+        "ok": ok,
+        "errors": {k: v for k, v in outcomes.items() if k not in ("200", "succeeded")},
+        "rps": total / wall,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "rss_growth_mb": rss_mb() - rss_before,
+    }
+
+
+async def run(workdir: Path, args):
+    import httpx
+    from app import app
+
+    install_fakes(args)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"startup RSS {rss_mb():.0f} MB")
+            print(f"{'scenario':>8} | {'conc':>4} | {'reqs':>5} | {'ok':>5} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'RSS +MB':>7} | errors")
+            print("-" * 100)
+            for name in args.scenarios:
+                request = make_scenario(name, workdir, args)
+                for concurrency in args.concurrency:
+                    total = args.requests if name == "invoke" else args.ingest_requests
+                    r = await run_load(client, request, concurrency, total)
+                    print(
+                        f"{name:>8} | {concurrency:>4} | {r['requests']:>5} | {r['ok']:>5} | {r['rps']:>7.1f} | "
+                        f"{r['p50_ms']:>8.1f} | {r['p95_ms']:>8.1f} | {r['p99_ms']:>8.1f} | {r['rss_growth_mb']:>7.1f} | "
+                        f"{r['errors'] or ''}"
+                    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["invoke", "create", "upload"], choices=["invoke", "create", "upload"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per invoke run")
+    parser.add_argument("--ingest-requests", type=int, default=20, help="jobs per create/upload run")
+    parser.add_argument("--sessions", type=int, default=0, help="distinct session ids for invoke (0: one per request)")
+    parser.add_argument("--tools", nargs="*", default=["vector_retriever"], help="tools the fake LLM calls each turn")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--tool-latency", type=float, default=0.1)
+    parser.add_argument("--startup-docs", type=int, default=20)
+    parser.add_argument("--docs-per-job", type=int, default=5)
+    parser.add_argument("--words", type=int, default=400, help="words per generated document")
+    parser.add_argument("--max-concurrent", type=int, default=64, help="AGENT_MAX_CONCURRENT for the run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-load-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, args)
+        asyncio.run(run(workdir, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compares reranker latency on synthetic candidate sets: the local `fusion` reranker
+(and `cross_encoder` when sentence-transformers is installed) against `LLMRerank`
+driven by a fake LLM that sleeps for `--llm-latency` seconds per call.
+
+    python -m benchmarks.bench_reranker --candidates 20 50 --llm-latency 0.8
+
+The LLM latency is simulated, so the `llm` row shows the round trip the other
+rerankers avoid rather than a real model's quality or speed.
+"""
+import argparse
+import time
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+
+from agents.reranker import build_reranker
+from benchmarks.fakes import FakeRerankLLM
+
+WORDS = (
+    "refund policy invoice account password reset shipping order delivery warranty "
+    "return support contact billing plan upgrade cancel subscription payment card error"
+).split()
+
+
+def candidates(rng, n, words_per_chunk):
+    return [
+        NodeWithScore(
+            node=TextNode(id_=f"node-{i}", text=" ".join(rng.choice(WORDS, words_per_chunk))),
+            score=float(rng.uniform(0.5, 0.9)),
+        )
+        for i in range(n)
+    ]
+
+
+def measure(reranker, rng, n, words_per_chunk, queries):
+    latencies = []
+    for _ in range(queries):
+        nodes = candidates(rng, n, words_per_chunk)
+        query = QueryBundle(" ".join(rng.choice(WORDS, 4)))
+        start = time.perf_counter()
+        reranker.postprocess_nodes(nodes, query_bundle=query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50])
+    parser.add_argument("--rerankers", nargs="+", default=["fusion", "cross_encoder", "llm"])
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--words", type=int, default=300, help="words per candidate chunk")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--llm-queries", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10} | {'reranker':>13} | {'p50 ms':>9} | {'p99 ms':>9}")
+    print("-" * 52)
+    for n in args.candidates:
+        for kind in args.rerankers:
+            try:
+                reranker = build_reranker(kind, top_n=args.top_n, llm=FakeRerankLLM(latency=args.llm_latency))
+            except ImportError as e:
+                print(f"{n:>10} | {kind:>13} | skipped ({e.name} not installed)")
+                continue
+            queries = args.llm_queries if kind == "llm" else args.queries
+            p50, p99 = measure(reranker, np.random.default_rng(args.seed), n, args.words, queries)
+            print(f"{n:>10} | {kind:>13} | {p50:>9.2f} | {p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
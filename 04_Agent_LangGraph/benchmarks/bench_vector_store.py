@@ -0,0 +1,109 @@
+"""
+Compares vector store backends of `ingestion.vector_store` on synthetic embeddings:
+build time, load time, resident memory after load and p50/p99 query latency.
+
+    python -m benchmarks.bench_vector_store --sizes 10000 100000 1000000 --dim 384
+
+The JSON-based `simple` store is skipped above `--simple-max` chunks, since it has to
+parse every vector into Python lists on load. Stores are read into memory, as ingestion
+jobs load their writable copy; `--mmap` measures the memory-mapped, read-only load the
+server queries.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import numpy as np
+import psutil
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from ingestion.vector_store import build_vector_store, load_vector_store
+
+BATCH_SIZE = 10_000
+
+
+def random_vectors(rng, n, dim):
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def build(backend, size, dim, rng, persist_dir):
+    store = build_vector_store(backend)
+    start = time.perf_counter()
+    for offset in range(0, size, BATCH_SIZE):
+        vectors = random_vectors(rng, min(BATCH_SIZE, size - offset), dim)
+        store.add([
+            TextNode(id_=f"node-{offset + i}", text="", embedding=vector.tolist())
+            for i, vector in enumerate(vectors)
+        ])
+    build_seconds = time.perf_counter() - start
+    store.persist(os.path.join(persist_dir, "default__vector_store.json"))
+    return build_seconds
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def measure(backend, size, dim, queries, top_k, seed, mmap):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as persist_dir:
+        build_seconds = build(backend, size, dim, rng, persist_dir)
+        gc.collect()
+
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        store = load_vector_store(persist_dir, mmap=mmap)
+        load_seconds = time.perf_counter() - start
+        rss_delta = rss_mb() - rss_before
+
+        latencies = []
+        for vector in random_vectors(rng, queries, dim):
+            query = VectorStoreQuery(query_embedding=vector.tolist(), similarity_top_k=top_k)
+            start = time.perf_counter()
+            store.query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        del store
+        gc.collect()
+
+    return {
+        "build_s": build_seconds,
+        "load_s": load_seconds,
+        "rss_mb": rss_delta,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", default=["simple", "faiss_flat", "faiss_hnsw", "faiss_ivf"])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--simple-max", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mmap", action="store_true", help="memory-map FAISS indexes on load (read-only)")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9} | {'backend':>10} | {'build s':>8} | {'load s':>7} | {'load MB':>8} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print("-" * 75)
+    for size in args.sizes:
+        for backend in args.backends:
+            if backend == "simple" and size > args.simple_max:
+                continue
+            r = measure(backend, size, args.dim, args.queries, args.top_k, args.seed, args.mmap)
+            print(
+                f"{size:>9} | {backend:>10} | {r['build_s']:>8.2f} | {r['load_s']:>7.3f} | "
+                f"{r['rss_mb']:>8.1f} | {r['p50_ms']:>7.2f} | {r['p99_ms']:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from typing import List
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model that sleeps for `latency` seconds and answers with `reply`.
+    With `tool_calls`, a turn that ends in the user's message is answered with one call to
+    each named tool (all in the same step) instead, passing the user's text as `query`.
+    """
+
+    latency: float = 0.0
+    reply: str = "This is a fake answer."
+    tool_calls: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _message(self, messages) -> AIMessage:
+        if not self.tool_calls or not isinstance(messages[-1], HumanMessage):
+            return AIMessage(content=self.reply)
+        calls = [
+            {"name": name, "args": {"query": messages[-1].content}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+            for name in self.tool_calls
+        ]
+        # Mirrors the OpenAI wire format, which `GraphBuilder._parse_response` reads.
+        raw_calls = [
+            {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": json.dumps(call["args"])}}
+            for call in calls
+        ]
+        return AIMessage(content="", tool_calls=calls, additional_kwargs={"tool_calls": raw_calls})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class FakeRerankLLM(CustomLLM):
+    """LlamaIndex LLM that sleeps for `latency` seconds and ranks the first two documents, as `LLMRerank` expects."""
+
+    latency: float = 0.0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="fake-rerank")
+
+    @llm_completion_callback()
+    def complete(self, prompt, formatted=False, **kwargs) -> CompletionResponse:
+        time.sleep(self.latency)
+        return CompletionResponse(text="Doc: 1, Relevance: 9\nDoc: 2, Relevance: 7")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        yield self.complete(prompt, formatted=formatted, **kwargs)
+
+
+class FakeSearchTool(BaseTool):
+    """Search tool stand-in that sleeps for `latency` seconds and echoes the query, or raises when `fail` is set."""
+
+    name: str = "fake_search"
+    description: str = "Looks things up."
+    latency: float = 0.0
+    fail: bool = False
+
+    def _answer(self, query: str) -> str:
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"Result for: {query}"
+
+    def _run(self, query: str, run_manager=None) -> str:
+        time.sleep(self.latency)
+        return self._answer(query)
+
+    async def _arun(self, query: str, run_manager=None) -> str:
+        await asyncio.sleep(self.latency)
+        return self._answer(query)
+
+
+class FakeEmbedding(BaseEmbedding):
+    """
+    LlamaIndex embedding model returning a unit vector seeded by the text's hash, after sleeping
+    `latency` seconds per request (one request per batch, like a real provider).
+    """
+
+    latency: float = 0.0
+    dim: int = 64
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeEmbedding"
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._get_text_embeddings([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._aget_text_embeddings([query]))[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
@@ -1,8 +1,10 @@
 import requests
 import streamlit as st
+import json
 import os
 from dotenv import load_dotenv
 import uuid
+import time
 
 load_dotenv()
 BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
@@ -17,12 +19,39 @@ if 'vector_store_ready' not in st.session_state:
 st.set_page_config(page_title="Langchain RAG Agent", layout="centered")
 st.title('🧠 LangGraph Agent Chat App')
 
+def wait_for_job(job_id):
+    progress_placeholder = st.empty()
+    while True:
+        job = requests.get(f"{BASE_URL}/vectordb/jobs/{job_id}").json()
+        progress = job.get("progress", {})
+        progress_placeholder.caption(
+            f"Stage: {job.get('stage') or job.get('status')} | "
+            f"documents: {progress.get('documents_loaded', 0)} | "
+            f"nodes embedded: {progress.get('nodes_embedded', 0)}/{progress.get('nodes_total', 0)}"
+        )
+        if job.get("status") in ("succeeded", "failed", "cancelled"):
+            progress_placeholder.empty()
+            return job
+        time.sleep(1)
+
+def show_ingestion_result(response, success_message):
+    if not (response.ok and "job_id" in response.json()):
+        detail = response.json().get("error") or response.json().get("detail", "")
+        st.error(f"❌ Failed to update vector store. {detail}")
+        return
+    job = wait_for_job(response.json()["job_id"])
+    if job["status"] == "succeeded":
+        st.success(success_message)
+        st.session_state.vector_store_ready = True
+    else:
+        st.error(f"❌ Ingestion {job['status']}. {job.get('error') or ''}")
+
 with st.expander("📥 Ingest Custom Data into Vector Store (if required)", expanded=False):
     st.markdown("##### Select a Data Source")
     source_type = st.selectbox("Select data source type:", ["website", "docs", "sql"])
 
     if source_type == "website":
-        source_path = st.text_input("Enter URL path:")
+        source_path = st.text_input("Enter URL(s) or sitemap URL:")
         if st.button("Ingest and Update Vector Store"):
             if source_path:
                 with st.spinner("Ingesting and updating vector store..."):
@@ -30,11 +59,7 @@ with st.expander("📥 Ingest Custom Data into Vector Store (if required)", expa
                         "source_type": source_type,
                         "source_path": source_path
                     })
-                    if response.ok and "message" in response.json():
-                        st.success("✅ Vector store updated successfully!")
-                        st.session_state.vector_store_ready = True
-                    else:
-                        st.error(f"❌ Failed to update vector store. {response.json().get('error', '')}")
+                    show_ingestion_result(response, "✅ Vector store updated successfully!")
             else:
                 st.warning("⚠️ Please enter a valid source path.")
     else:
@@ -44,11 +69,7 @@ with st.expander("📥 Ingest Custom Data into Vector Store (if required)", expa
                 with st.spinner("Uploading and indexing file..."):
                     files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
                     response = requests.post(f"{BASE_URL}/vectordb/upload", files=files)
-                    if response.ok and "message" in response.json():
-                        st.success(f"✅ {response.json()['message']}")
-                        st.session_state.vector_store_ready = True
-                    else:
-                        st.error(f"❌ Upload failed. {response.json().get('error', '')}")
+                    show_ingestion_result(response, f"✅ Uploaded and indexed file: {uploaded_file.name}")
             else:
                 st.warning("⚠️ Please upload a valid file.")
 
@@ -66,11 +87,15 @@ model_label_map = {
 }
 model_choice_label = st.selectbox("Choose a model:", list(model_label_map.keys()))
 model_choice = model_label_map[model_choice_label]
+stream_mode = st.toggle("⚡ Stream responses", value=True)
 
 def render_response(response_data):
     if "final_output" in response_data:
         st.chat_message("assistant").markdown(response_data["final_output"])
+        render_details(response_data)
 
+def render_details(response_data):
+    if "final_output" in response_data:
         with st.expander("🛠 Tools Used", expanded=False):
             if response_data.get("tools_used"):
                 for tool in response_data["tools_used"]:
@@ -82,7 +107,11 @@ def render_response(response_data):
             if response_data.get("retrieved_chunks"):
                 for chunk in response_data["retrieved_chunks"]:
                     st.markdown(f"**Tool**: `{chunk.get('tool')}` | **Type**: `{chunk.get('type')}`")
-                    st.code(chunk.get("data", ""))
+                    data = chunk.get("data", "")
+                    if isinstance(data, dict):
+                        st.caption(f"Source: {data.get('source')} | Score: {data.get('score')}")
+                        data = data.get("text", "")
+                    st.code(data)
             else:
                 st.markdown("_None_")
 
@@ -94,7 +123,7 @@ def render_response(response_data):
                         st.markdown(f"- Tool: `{step.get('tool')}`")
                         st.markdown(f"- Arguments: `{step.get('args')}`")
                     elif step["type"] == "tool_response":
-                        st.markdown(f"- Tool: `{step.get('tool')}`")
+                        st.markdown(f"- Tool: `{step.get('tool')}` ({step.get('status')}, {step.get('duration_ms')} ms)")
                         st.code(step.get("content", ""))
                     elif step["type"] == "ai_final_response":
                         st.markdown(f"- Final Response: {step.get('content')}")
@@ -107,20 +136,74 @@ for chat in st.session_state.chat_history:
     st.chat_message("user").markdown(chat["user"])
     render_response(chat["response"])
 
+def agent_payload(prompt):
+    return {
+        "input": {"input": prompt},
+        "model": model_choice,
+        "session_id": st.session_state.chat_session_id
+    }
+
+def stream_events(prompt):
+    with requests.post(f"{BASE_URL}/agent/stream", json=agent_payload(prompt), stream=True) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+                continue
+            if line.startswith(":"):
+                continue
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+
+def stream_response(prompt):
+    answer_placeholder = st.chat_message("assistant").empty()
+    status_placeholder = st.empty()
+    answer = ""
+    data = None
+
+    for event, payload in stream_events(prompt):
+        if event == "token":
+            answer += payload.get("content", "")
+            answer_placeholder.markdown(answer + "▌")
+        elif event == "tool_start":
+            status_placeholder.info(f"🛠 Calling `{payload.get('tool')}`...")
+        elif event == "tool_end":
+            status_placeholder.info(f"✅ `{payload.get('tool')}` returned, thinking...")
+        elif event == "final":
+            data = payload
+        elif event == "error":
+            raise RuntimeError(payload.get("detail"))
+
+    status_placeholder.empty()
+    if data is None:
+        raise RuntimeError("Stream ended without a final response.")
+    answer_placeholder.markdown(data.get("final_output") or answer)
+    return data
+
 prompt = st.chat_input("Enter your question...")
-if prompt:
+if prompt and stream_mode:
+    st.chat_message("user").markdown(prompt)
+
+    try:
+        data = stream_response(prompt)
+        st.session_state.chat_history.append({
+            "user": prompt,
+            "response": data
+        })
+        render_details(data)
+
+    except Exception as e:
+        st.error(f"❌ Error occurred: {e}")
+
+elif prompt:
     st.chat_message("user").markdown(prompt)
 
     with st.spinner("Thinking..."):
         try:
-            response = requests.post(
-                f"{BASE_URL}/agent/invoke",
-                json={
-                    "input": {"input": prompt},
-                    "model": model_choice,
-                    "session_id": st.session_state.chat_session_id
-                }
-            )
+            response = requests.post(f"{BASE_URL}/agent/invoke", json=agent_payload(prompt))
             response.raise_for_status()
             data = response.json()
 
@@ -2,4 +2,4 @@
 # Optional place to initialize configs or shared imports
 
 # Example:
-from .index_builder import create_index, load_index
+from .index_builder import create_index, load_index, index_handle, get_bm25_index
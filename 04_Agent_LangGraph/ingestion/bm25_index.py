@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter, defaultdict
+import heapq
+import json
+import logging
+import math
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+BM25_FILENAME = "bm25_index.json"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index over the chunks of the vector index, for keyword (BM25) search.
+
+    Chunks are added and removed together with the vector index (by node and ref doc id) and
+    persisted next to it as `bm25_index.json`; only the per-chunk term counts are stored, the
+    postings are rebuilt on load. Callers serialize access with the index handle's lock.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # node_id -> (ref_doc_id, {term: count})
+        self._nodes: Dict[str, Tuple[Optional[str], Dict[str, int]]] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._ref_docs: Dict[str, set] = defaultdict(set)
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _add(self, node_id: str, ref_doc_id: Optional[str], terms: Dict[str, int]):
+        if node_id in self._nodes:
+            self._remove(node_id)
+        self._nodes[node_id] = (ref_doc_id, terms)
+        for term, count in terms.items():
+            self._postings[term][node_id] = count
+        if ref_doc_id is not None:
+            self._ref_docs[ref_doc_id].add(node_id)
+        length = sum(terms.values())
+        self._lengths[node_id] = length
+        self._total_length += length
+
+    def _remove(self, node_id: str):
+        ref_doc_id, terms = self._nodes.pop(node_id)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(node_id, None)
+            if not postings:
+                del self._postings[term]
+        if ref_doc_id is not None:
+            self._ref_docs[ref_doc_id].discard(node_id)
+            if not self._ref_docs[ref_doc_id]:
+                del self._ref_docs[ref_doc_id]
+        self._total_length -= self._lengths.pop(node_id)
+
+    def add(self, nodes: Iterable):
+        for node in nodes:
+            self._add(node.node_id, node.ref_doc_id, dict(Counter(tokenize(node.get_content()))))
+
+    def delete_ref_doc(self, ref_doc_id: str):
+        for node_id in list(self._ref_docs.get(ref_doc_id, ())):
+            self._remove(node_id)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Returns up to `top_k` `(node_id, score)` pairs, best first."""
+        n = len(self._nodes)
+        if not n:
+            return []
+        avg_length = self._total_length / n or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for node_id, count in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[node_id] / avg_length)
+                scores[node_id] += idf * count * (self.k1 + 1) / (count + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def persist(self, persist_dir: str):
+        path = os.path.join(persist_dir, BM25_FILENAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "nodes": self._nodes}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_dir: str) -> Optional["BM25Index"]:
+        path = os.path.join(persist_dir, BM25_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        for node_id, (ref_doc_id, terms) in data["nodes"].items():
+            index._add(node_id, ref_doc_id, terms)
+        logger.info("🔤 Loaded BM25 index with %d chunks", len(index))
+        return index
@@ -0,0 +1,204 @@
+from typing import Dict, List, Optional, Set
+from urllib.parse import urldefrag, urljoin, urlparse
+import asyncio
+import logging
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from dotenv import load_dotenv
+
+import html2text
+import httpx
+from bs4 import BeautifulSoup
+from llama_index.core import Document
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "0"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "100"))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "16"))
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "4"))
+CRAWL_TIMEOUT_SECONDS = float(os.getenv("CRAWL_TIMEOUT_SECONDS", "15"))
+CRAWL_SAME_HOST = os.getenv("CRAWL_SAME_HOST", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def website_doc_id(url: str) -> str:
+    return f"website:{url}"
+
+
+def parse_seeds(source_path: str) -> List[str]:
+    """`source_path` is one URL, several URLs separated by commas/whitespace, or a sitemap URL."""
+    return [url.strip() for url in source_path.replace(",", " ").split() if url.strip()]
+
+
+def _normalize(url: str) -> str:
+    return urldefrag(url)[0]
+
+
+def _is_sitemap(url: str) -> bool:
+    return urlparse(url).path.endswith(".xml")
+
+
+class WebsiteCrawler:
+    """
+    Breadth-first crawler for the `website` source.
+
+    Pages are fetched concurrently (at most `concurrency` in total and `per_host` per host) up to
+    `max_depth` links away from the seeds and `max_pages` pages. `http_cache` maps a URL to its
+    ETag / Last-Modified / outgoing links from the last crawl; URLs listed in `known_urls` are
+    re-fetched with conditional GETs, and a 304 marks the page as unchanged without downloading it.
+    Known pages on the crawled hosts that the crawl no longer reaches end up in `unlinked`, unless
+    the page cap cut the crawl short or a fetch failed (an outage must not empty the index).
+    Pass an httpx `transport` to crawl a local stand-in instead of the network.
+    """
+
+    def __init__(self, seeds: List[str], http_cache: Dict[str, dict], known_urls: Set[str] = frozenset(),
+                 max_depth: int = CRAWL_MAX_DEPTH, max_pages: int = CRAWL_MAX_PAGES,
+                 concurrency: int = CRAWL_CONCURRENCY, per_host: int = CRAWL_PER_HOST_CONCURRENCY,
+                 timeout: float = CRAWL_TIMEOUT_SECONDS, same_host: bool = CRAWL_SAME_HOST,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.seeds = [_normalize(url) for url in seeds]
+        self.http_cache = http_cache
+        self.known_urls = known_urls
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.same_host = same_host
+        self.transport = transport
+        self.allowed_hosts = {urlparse(url).netloc for url in self.seeds}
+
+        self.documents: List[Document] = []
+        self.unchanged: Set[str] = set()
+        self.gone: Set[str] = set()
+        self.failed: Set[str] = set()
+        self.unlinked: Set[str] = set()
+
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._host_semaphores[host]
+
+    async def _get(self, client: httpx.AsyncClient, url: str, headers: dict = None) -> httpx.Response:
+        async with self._semaphore, self._host_semaphore(url):
+            return await client.get(url, headers=headers or {})
+
+    async def _expand_sitemap(self, client: httpx.AsyncClient, url: str, depth: int = 0) -> List[str]:
+        response = await self._get(client, url)
+        response.raise_for_status()
+        root = ET.fromstring(response.content)
+        locations = [loc.text.strip() for loc in root.iter(f"{SITEMAP_NS}loc") if loc.text]
+        if root.tag == f"{SITEMAP_NS}sitemapindex" and depth < 1:
+            nested = await asyncio.gather(*(self._expand_sitemap(client, loc, depth + 1) for loc in locations))
+            return [page for pages in nested for page in pages]
+        return locations
+
+    def _links(self, base_url: str, html: str) -> List[str]:
+        links = []
+        for anchor in BeautifulSoup(html, "html.parser").find_all("a", href=True):
+            url = _normalize(urljoin(base_url, anchor["href"]))
+            parsed = urlparse(url)
+            if parsed.scheme not in ("http", "https"):
+                continue
+            if self.same_host and parsed.netloc not in self.allowed_hosts:
+                continue
+            links.append(url)
+        return list(dict.fromkeys(links))
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> List[str]:
+        """Fetches one page and returns its outgoing links."""
+        cached = self.http_cache.get(url, {})
+        headers = {}
+        if website_doc_id(url) in self.known_urls:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            response = await self._get(client, url, headers)
+        except httpx.HTTPError as e:
+            logger.warning("⚠️ Failed to fetch %s: %s", url, e)
+            self.failed.add(url)
+            return cached.get("links", [])
+
+        if response.status_code == 304:
+            self.unchanged.add(url)
+            return cached.get("links", [])
+        if response.status_code in (404, 410):
+            self.gone.add(url)
+            self.http_cache.pop(url, None)
+            return []
+        if response.status_code != 200:
+            logger.warning("⚠️ %s returned HTTP %d", url, response.status_code)
+            self.failed.add(url)
+            return cached.get("links", [])
+
+        content_type = response.headers.get("content-type", "")
+        if "html" in content_type:
+            html = response.text
+            text = html2text.html2text(html)
+            links = self._links(url, html)
+        elif content_type.startswith("text/"):
+            text, links = response.text, []
+        else:
+            logger.info("⏭️ Skipping %s (%s)", url, content_type)
+            return []
+
+        self.http_cache[url] = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "links": links,
+        }
+        self.documents.append(Document(text=text, id_=website_doc_id(url), metadata={"url": url}))
+        return links
+
+    async def crawl(self) -> List[Document]:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True, transport=self.transport) as client:
+            frontier = []
+            for seed in self.seeds:
+                if _is_sitemap(seed):
+                    frontier.extend(_normalize(url) for url in await self._expand_sitemap(client, seed))
+                else:
+                    frontier.append(seed)
+
+            seen = set()
+            truncated = False
+            for depth in range(self.max_depth + 1):
+                frontier = [url for url in dict.fromkeys(frontier) if url not in seen]
+                remaining = max(0, self.max_pages - len(seen))
+                truncated = truncated or len(frontier) > remaining
+                frontier = frontier[:remaining]
+                if not frontier:
+                    break
+                seen.update(frontier)
+                results = await asyncio.gather(*(self._fetch(client, url) for url in frontier))
+                frontier = [link for links in results for link in links]
+
+        if not truncated and not self.failed:
+            prefix = website_doc_id("")
+            self.unlinked = {
+                doc_id[len(prefix):] for doc_id in self.known_urls
+                if doc_id.startswith(prefix) and urlparse(doc_id[len(prefix):]).netloc in self.allowed_hosts
+            } - seen
+            for url in self.unlinked:
+                self.http_cache.pop(url, None)
+
+        logger.info(
+            "🕸️ Crawled %d pages: %d changed, %d unchanged (304), %d gone, %d unlinked, %d failed",
+            len(seen), len(self.documents), len(self.unchanged), len(self.gone), len(self.unlinked), len(self.failed)
+        )
+        return self.documents
+
+    def run(self) -> List[Document]:
+        return asyncio.run(self.crawl())
@@ -0,0 +1,202 @@
+from typing import List, Optional, Sequence
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+import numpy as np
+from pydantic import PrivateAttr
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from metrics import CACHE_REQUESTS
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement.
+LOOKUP_CHUNK = 500
+
+_embedding_cache = None
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (embedding model, sha256 of the chunk text).
+    Vectors are stored as float32 blobs; least recently used entries are evicted past `max_entries`.
+    The row count is read once on open and then kept up to date from insert/delete row counts,
+    so writes never scan the table.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        hashes = [text_hash(t) for t in texts]
+        found = {}
+        now = time.time()
+        with self._lock, self._conn:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), LOOKUP_CHUNK):
+                chunk = unique[start:start + LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found]
+                )
+
+        results = [
+            np.frombuffer(found[h], dtype=np.float32).tolist() if h in found else None
+            for h in hashes
+        ]
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        CACHE_REQUESTS.labels("embedding", "hit").inc(hits)
+        CACHE_REQUESTS.labels("embedding", "miss").inc(len(results) - hits)
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        now = time.time()
+        rows = [
+            (model, text_hash(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock, self._conn:
+            # Same model and text give the same vector, so existing rows only need their last_used refreshed.
+            inserted = self._conn.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)", rows).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, row[1]) for row in rows]
+                )
+            self._entries += inserted
+            overflow = self._entries - self.max_entries
+            if overflow > 0:
+                evicted = self._conn.execute(
+                    "DELETE FROM embeddings WHERE (model, text_hash) IN ("
+                    " SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+                self._entries -= evicted
+                self.evictions += evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            # Resync with the table, which other processes sharing the file may have written to.
+            self._entries = entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "db_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """LlamaIndex embedding model that consults an EmbeddingCache before calling the wrapped model."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _cache_key: str = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        super().__init__(model_name=inner.model_name, embed_batch_size=inner.embed_batch_size, **kwargs)
+        self._inner = inner
+        self._cache = cache
+        self._cache_key = f"{inner.class_name()}:{inner.model_name}"
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._inner.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _split(self, texts: List[str]):
+        cached = self._cache.get_many(self._cache_key, texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        return cached, missing
+
+    def _merge(self, texts, cached, missing, vectors):
+        self._cache.put_many(self._cache_key, [texts[i] for i in missing], vectors)
+        for i, vector in zip(missing, vectors):
+            cached[i] = vector
+        return cached
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        cached, missing = self._split(texts)
+        if not missing:
+            return cached
+        vectors = self._inner.get_text_embedding_batch([texts[i] for i in missing])
+        return self._merge(texts, cached, missing, vectors)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        cached, missing = self._split(texts)
+        if not missing:
+            return cached
+        vectors = await self._inner.aget_text_embedding_batch([texts[i] for i in missing])
+        return self._merge(texts, cached, missing, vectors)
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _embedding_cache
+    if _embedding_cache is None and EMBEDDING_CACHE_PATH:
+        _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+        logger.info("🗃️ Embedding cache at %s", EMBEDDING_CACHE_PATH)
+    return _embedding_cache
+
+
+def cached_embed_model(embed_model: BaseEmbedding) -> BaseEmbedding:
+    cache = get_embedding_cache()
+    if cache is None or isinstance(embed_model, CachedEmbedding):
+        return embed_model
+    return CachedEmbedding(embed_model, cache)
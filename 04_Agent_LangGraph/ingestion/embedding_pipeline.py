@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextvars import copy_context
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+import tiktoken
+from opentelemetry import trace
+from llama_index.core.schema import MetadataMode
+from metrics import EMBED_BATCH_SECONDS, ERRORS
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "100000"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_SECONDS = float(os.getenv("EMBED_BACKOFF_SECONDS", "1.0"))
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+_encoding = None
+
+
+def _count_tokens(text: str) -> int:
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(error).__name__ or "429" in str(error)
+
+
+def pack_batches(nodes, max_items: int = EMBED_BATCH_SIZE, max_tokens: int = EMBED_BATCH_MAX_TOKENS):
+    """Lazily groups nodes into batches of at most `max_items` nodes and `max_tokens` tokens."""
+    batch, batch_tokens = [], 0
+    for node in nodes:
+        text = node.get_content(metadata_mode=MetadataMode.EMBED)
+        tokens = _count_tokens(text)
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append((node, text))
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def pipeline_embed_model(embed_model):
+    """
+    Copy of `embed_model` for the pipeline, which does its own batching and rate-limit backoff:
+    the provider client must neither retry 429s internally (OpenAIEmbedding defaults to 10
+    retries) nor re-split a packed batch into `embed_batch_size` sequential requests.
+    """
+    updates = {"embed_batch_size": EMBED_BATCH_SIZE}
+    if "max_retries" in type(embed_model).model_fields:
+        updates["max_retries"] = 0
+    model = embed_model.model_copy(update=updates)
+    # Clients are created lazily with the retry setting of the moment; drop any copied one.
+    for attr in ("_client", "_aclient"):
+        if getattr(model, attr, None) is not None:
+            setattr(model, attr, None)
+    return model
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that halves on rate-limit errors and grows back by one per success
+    (AIMD), so the pipeline settles just under the provider's limit.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, rate_limited: bool = False):
+        with self._cond:
+            self.active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+            elif self.limit < self.max_limit:
+                self.limit += 1
+            self._cond.notify_all()
+
+
+def _embed_batch(embed_model, batch, limiter: AdaptiveLimiter, stats: dict, stats_lock: threading.Lock):
+    with tracer.start_as_current_span("embed_batch", attributes={"embed.chunks": len(batch)}):
+        texts = [text for _, text in batch]
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            limiter.acquire()
+            start = time.perf_counter()
+            try:
+                vectors = embed_model.get_text_embedding_batch(texts)
+            except Exception as e:
+                limiter.release(rate_limited=is_rate_limit_error(e))
+                ERRORS.labels("embedding_rate_limit" if is_rate_limit_error(e) else "embedding").inc()
+                if not is_rate_limit_error(e) or attempt == EMBED_MAX_RETRIES:
+                    raise
+                delay = EMBED_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+                with stats_lock:
+                    stats["rate_limited"] += 1
+                logger.warning("⏳ Embedding batch rate limited, retrying in %.1fs (limit now %d)", delay, limiter.limit)
+                time.sleep(delay)
+                continue
+            limiter.release()
+            EMBED_BATCH_SECONDS.observe(time.perf_counter() - start)
+            nodes = []
+            for (node, _), vector in zip(batch, vectors):
+                node.embedding = vector
+                nodes.append(node)
+            return nodes
+
+
+def embed_nodes(nodes, embed_model, sink, progress, concurrency: int = EMBED_CONCURRENCY) -> dict:
+    """
+    Embeds `nodes` (any iterable, consumed lazily) in token-packed batches on `concurrency`
+    threads and hands every finished batch to `sink(nodes)` right away, in completion order.
+    At most 2 * `concurrency` batches are held in memory. Returns throughput stats.
+    """
+    start = time.perf_counter()
+    stats = {"chunks": 0, "batches": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+    limiter = AdaptiveLimiter(concurrency)
+    max_pending = 2 * max(1, concurrency)
+    batches = pack_batches(nodes)
+    embedded = 0
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed")
+    try:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                stats["batches"] += 1
+                progress("embedding", nodes_total=stats["chunks"] + len(batch))
+                stats["chunks"] += len(batch)
+                # copy_context parents the batch's span to the ingestion span.
+                pending.add(executor.submit(copy_context().run, _embed_batch, embed_model, batch, limiter, stats, stats_lock))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_nodes = future.result()
+                sink(batch_nodes)
+                embedded += len(batch_nodes)
+                progress("embedding", nodes_embedded=embedded)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 1) if elapsed > 0 else None
+    logger.info(
+        "🚀 Embedded %d chunks in %d batches in %.2fs (%.1f chunks/s, %d rate-limited retries)",
+        stats["chunks"], stats["batches"], elapsed, stats["chunks_per_second"] or 0, stats["rate_limited"]
+    )
+    return stats
@@ -0,0 +1,112 @@
+from typing import List
+import asyncio
+import logging
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+from opentelemetry import trace
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from metrics import RETRIEVAL_SECONDS, observe
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+RRF_K = int(os.getenv("RRF_K", "60"))
+RETRIEVAL_EMBED_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_EMBED_TIMEOUT_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses dense (vector) and BM25 rankings with reciprocal rank fusion.
+
+    `mode` is `hybrid`, `vector` or `lexical`. The lexical path needs no embedding call; in
+    `hybrid` mode it is also the fallback when embedding the query fails or, on the async
+    path, takes longer than `embed_timeout` seconds.
+    """
+
+    def __init__(self, vector_retriever, bm25_index, docstore, top_k: int,
+                 mode: str = RETRIEVAL_MODE, rrf_k: int = RRF_K,
+                 embed_timeout: float = RETRIEVAL_EMBED_TIMEOUT_SECONDS):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode: {mode}")
+        super().__init__()
+        self._vector_retriever = vector_retriever
+        self._bm25_index = bm25_index
+        self._docstore = docstore
+        self._top_k = top_k
+        self._mode = mode
+        self._rrf_k = rrf_k
+        self._embed_timeout = embed_timeout
+
+    def _lexical(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        hits = self._bm25_index.search(query_bundle.query_str, self._top_k)
+        results = []
+        for node_id, score in hits:
+            node = self._docstore.get_node(node_id, raise_error=False)
+            if node is not None:
+                results.append(NodeWithScore(node=node, score=score))
+        return results
+
+    def _fuse(self, vector_results: List[NodeWithScore], lexical_results: List[NodeWithScore]) -> List[NodeWithScore]:
+        scores, nodes = {}, {}
+        for ranking in (vector_results, lexical_results):
+            for rank, result in enumerate(ranking):
+                node_id = result.node.node_id
+                scores[node_id] = scores.get(node_id, 0.0) + 1.0 / (self._rrf_k + rank + 1)
+                nodes.setdefault(node_id, result.node)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self._top_k]
+        return [NodeWithScore(node=nodes[node_id], score=scores[node_id]) for node_id in ranked]
+
+    def _span(self):
+        return tracer.start_as_current_span("retrieve", attributes={"retrieval.mode": self._mode, "retrieval.top_k": self._top_k})
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with self._span() as span, observe(RETRIEVAL_SECONDS, mode=self._mode):
+            results = self._retrieve_ranked(query_bundle)
+            span.set_attribute("retrieval.chunks", len(results))
+            return results
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with self._span() as span, observe(RETRIEVAL_SECONDS, mode=self._mode):
+            results = await self._aretrieve_ranked(query_bundle)
+            span.set_attribute("retrieval.chunks", len(results))
+            return results
+
+    def _retrieve_ranked(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if self._mode == "vector":
+            return self._vector_retriever.retrieve(query_bundle)
+        lexical = self._lexical(query_bundle)
+        if self._mode == "lexical":
+            return lexical
+        try:
+            vector = self._vector_retriever.retrieve(query_bundle)
+        except Exception as e:
+            logger.warning("⚠️ Vector retrieval failed, using BM25 only: %s", e)
+            return lexical
+        return self._fuse(vector, lexical)
+
+    async def _aretrieve_ranked(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if self._mode == "vector":
+            return await self._vector_retriever.aretrieve(query_bundle)
+        lexical = self._lexical(query_bundle)
+        if self._mode == "lexical":
+            return lexical
+        try:
+            vector = await asyncio.wait_for(
+                self._vector_retriever.aretrieve(query_bundle),
+                timeout=self._embed_timeout or None
+            )
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Query embedding took longer than %.1fs, using BM25 only", self._embed_timeout)
+            return lexical
+        except Exception as e:
+            logger.warning("⚠️ Vector retrieval failed, using BM25 only: %s", e)
+            return lexical
+        return self._fuse(vector, lexical)
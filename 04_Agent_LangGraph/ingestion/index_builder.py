@@ -1,38 +1,282 @@
-from llama_index.core import VectorStoreIndex, StorageContext, load_index_from_storage
+from llama_index.core import VectorStoreIndex, StorageContext, Settings, load_index_from_storage
 from llama_index.core.node_parser import SentenceSplitter
-from .sources import get_documents
+from .sources import iter_documents, is_legacy_sql_doc_id, sql_doc_id_prefix, sql_doc_ids, sql_watermark_key
+from .crawler import WebsiteCrawler, parse_seeds, website_doc_id
+from .manifest import IngestManifest, content_hash
+from .vector_store import FaissVectorStore, build_vector_store, load_vector_store
+from .index_handle import IndexHandle
+from .bm25_index import BM25Index
+from .embedding_cache import cached_embed_model, get_embedding_cache
+from .embedding_pipeline import embed_nodes, pipeline_embed_model
 import os
 import logging
+import threading
+import time
 from pathlib import Path
 from dotenv import load_dotenv
+from metrics import INGEST_STAGE_SECONDS
+from opentelemetry import trace
 
 env_path = Path(__file__).resolve().parents[1]/'.env'
 load_dotenv(dotenv_path=env_path)
 VECTORDB_PATH = os.getenv("VECTORDB_PATH")
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH") or (
+    os.path.join(VECTORDB_PATH, "ingest_manifest.json") if VECTORDB_PATH else None
+)
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
-def create_index(source_type, source_path):
-    documents = get_documents(source_type, source_path)
-    splitter = SentenceSplitter(chunk_size=512, chunk_overlap=50)
-    nodes = splitter.get_nodes_from_documents(documents)
+# Serializes writers of the persisted index and manifest (startup ingestion, jobs, API calls).
+_write_lock = threading.Lock()
 
-    if os.path.exists(VECTORDB_PATH):
-        # Load existing index
-        storage_context = StorageContext.from_defaults(persist_dir=VECTORDB_PATH)
-        index = load_index_from_storage(storage_context)
-        # Append new documents
-        index.insert_nodes(nodes)
+def _noop_progress(stage, **counters):
+    pass
+
+def _persisted_bytes(persist_dir):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(persist_dir) for name in names
+    )
+
+def create_index(source_type, source_path, progress=None):
+    progress = progress or _noop_progress
+    with _write_lock, tracer.start_as_current_span("ingest", attributes={"ingest.source_type": source_type}) as span:
+        report = _create_index(source_type, source_path, progress)
+        for key in ("inserted", "updated", "skipped", "deleted", "nodes"):
+            span.set_attribute(f"ingest.{key}", report[key])
+        for stage, seconds in report["stage_seconds"].items():
+            span.set_attribute(f"ingest.{stage}_seconds", seconds)
+        return report
+
+def _create_index(source_type, source_path, progress):
+    manifest = IngestManifest.load(MANIFEST_PATH)
+    report = {"source_type": source_type, "inserted": 0, "updated": 0, "skipped": 0, "deleted": 0, "nodes": 0}
+    # Ids of documents produced by changed files in an earlier ingestion; whatever is not
+    # produced again by this ingestion is deleted at the end.
+    previous_file_doc_ids = set()
+    file_doc_ids = {}
+    # Documents known to be gone from their source (e.g. deleted SQL rows).
+    removed_doc_ids = set()
+    new_hashes = {}
+    loaded = 0
+    watermark_key, watermark = None, None
+    crawler = None
+    # Stages overlap in the streamed pipeline, so each one accumulates the time spent inside it.
+    stage_seconds = {"load": 0.0, "split": 0.0, "embed": 0.0, "persist": 0.0}
+    load_start = time.perf_counter()
+
+    progress("loading")
+    if source_type == "docs":
+        # Unchanged files are not even parsed; documents of files deleted from the folder are removed.
+        changed_files, unchanged_files, removed_files = manifest.changed_files(source_path)
+        report["skipped"] += sum(len(manifest.files[path]["doc_ids"]) for path in unchanged_files)
+        documents = iter_documents(source_type, source_path, input_files=list(changed_files)) if changed_files else iter(())
+        for path in changed_files:
+            previous_file_doc_ids.update(manifest.files.get(path, {}).get("doc_ids", []))
+            file_doc_ids[path] = []
+        for path in removed_files:
+            previous_file_doc_ids.update(manifest.files[path].get("doc_ids", []))
+    elif source_type == "sql":
+        # With a watermark column only rows past the stored watermark are pulled; otherwise all rows are
+        # read and only those whose text changed are re-embedded. Deleted rows are found from the id column alone.
+        changed_files, removed_files = {}, []
+        watermark_key = sql_watermark_key(source_path)
+        watermark = manifest.watermarks.get(watermark_key) if watermark_key is not None else None
+        prefix = sql_doc_id_prefix(source_path)
+        current_ids = sql_doc_ids(source_path)
+        # Legacy question-hash ids are always removed; their rows come back under row ids.
+        removed_doc_ids = {
+            doc_id for doc_id in manifest.documents
+            if (doc_id.startswith(prefix) and doc_id not in current_ids) or is_legacy_sql_doc_id(source_path, doc_id)
+        }
+        documents = iter_documents(source_type, source_path, since=watermark)
+    elif source_type == "website":
+        # Pages already in the index are fetched with conditional GETs; a 304 is neither downloaded nor re-embedded.
+        changed_files, removed_files = {}, []
+        crawler = WebsiteCrawler(parse_seeds(source_path), http_cache=manifest.http_cache, known_urls=set(manifest.documents))
+        documents = iter_documents(source_type, source_path, crawler=crawler)
     else:
-        # Create new index
-        index = VectorStoreIndex(nodes=nodes)
+        changed_files, removed_files = {}, []
+        documents = iter_documents(source_type, source_path)
+
+    stage_seconds["load"] += time.perf_counter() - load_start
+    # The job changes a private copy of the persisted index, loaded at its first change. Readers
+    # keep querying the live snapshot until the finished copy is persisted and published in one
+    # swap, so they never see a half-ingested document and a failed job changes nothing.
+    stage = {}
+
+    def staged():
+        if not stage:
+            stage["index"] = load_index(mmap=False)
+            stage["bm25"] = _load_bm25_index(stage["index"])
+        return stage
+
+    def timed_documents():
+        iterator = iter(documents)
+        while True:
+            start = time.perf_counter()
+            doc = next(iterator, None)
+            stage_seconds["load"] += time.perf_counter() - start
+            if doc is None:
+                return
+            yield doc
+
+    def changed_documents():
+        # Documents stream from the loader through here into the splitter and the embedder.
+        nonlocal loaded, watermark
+        for doc in timed_documents():
+            loaded += 1
+            progress("loading", documents_loaded=loaded)
+            path = doc.metadata.get("file_path")
+            if path in file_doc_ids:
+                file_doc_ids[path].append(doc.id_)
+            if watermark_key is not None and doc.metadata.get("watermark") is not None:
+                watermark = doc.metadata["watermark"] if watermark is None else max(watermark, doc.metadata["watermark"])
+
+            digest = content_hash(doc.text)
+            if manifest.documents.get(doc.id_) == digest:
+                report["skipped"] += 1
+                continue
+
+            known = doc.id_ in manifest.documents
+            report["updated" if known else "inserted"] += 1
+            # Inserts are upserts: an earlier job may have persisted this document without
+            # recording it in the manifest.
+            index, bm25_index = staged()["index"], stage["bm25"]
+            if index is not None and (known or index.docstore.get_ref_doc_info(doc.id_) is not None):
+                # The old version goes first: deleting by ref doc id later would also drop the new nodes.
+                index.delete_ref_doc(doc.id_, delete_from_docstore=True)
+                bm25_index.delete_ref_doc(doc.id_)
+            new_hashes[doc.id_] = digest
+            yield doc
+
+    splitter = SentenceSplitter(chunk_size=512, chunk_overlap=50)
 
-    # Save the updated or new index
-    index.storage_context.persist(persist_dir=VECTORDB_PATH)
-    return index
+    def split_nodes():
+        for doc in changed_documents():
+            start = time.perf_counter()
+            nodes = splitter.get_nodes_from_documents([doc])
+            stage_seconds["split"] += time.perf_counter() - start
+            report["nodes"] += len(nodes)
+            yield from nodes
 
-def load_index():
+    def insert_batch(batch_nodes):
+        # Embedded batches are streamed into the staged copy as they complete.
+        staged()
+        if stage["index"] is None:
+            storage_context = StorageContext.from_defaults(vector_store=build_vector_store())
+            stage["index"] = VectorStoreIndex(nodes=batch_nodes, storage_context=storage_context)
+        else:
+            stage["index"].insert_nodes(batch_nodes)
+        stage["bm25"].add(batch_nodes)
+
+    cache = get_embedding_cache()
+    hits_before = cache.hits if cache else 0
+    # Chunks embedded before (by text and model) are served from the on-disk embedding cache.
+    pipeline_start, load_before = time.perf_counter(), stage_seconds["load"]
+    # Loading, splitting and embedding overlap, so they share one span; embedding batches are its children.
+    with tracer.start_as_current_span("ingest.pipeline"):
+        report["embedding"] = embed_nodes(
+            split_nodes(), cached_embed_model(pipeline_embed_model(Settings.embed_model)), insert_batch, progress
+        )
+    # Pipeline time not spent loading or splitting: embedding and inserting into the index.
+    pipeline_seconds = time.perf_counter() - pipeline_start
+    stage_seconds["embed"] = max(0.0, pipeline_seconds - stage_seconds["split"] - (stage_seconds["load"] - load_before))
+    report["embedding_cache_hits"] = (cache.hits - hits_before) if cache else 0
+
+    if crawler is not None:
+        report["skipped"] += len(crawler.unchanged)
+        removed_doc_ids = {website_doc_id(url) for url in crawler.gone | crawler.unlinked}
+
+    produced = {doc_id for doc_ids in file_doc_ids.values() for doc_id in doc_ids}
+    vanished = {doc_id for doc_id in (previous_file_doc_ids - produced) | removed_doc_ids if doc_id in manifest.documents}
+    report["deleted"] = len(vanished)
+    if vanished and staged()["index"] is not None:
+        for doc_id in vanished:
+            stage["index"].delete_ref_doc(doc_id, delete_from_docstore=True)
+            stage["bm25"].delete_ref_doc(doc_id)
+
+    progress("persisting")
+    persist_start = time.perf_counter()
+    with tracer.start_as_current_span("ingest.persist"):
+        if not new_hashes and not vanished:
+            logger.info("⏭️ Nothing new to index from %s (%d documents unchanged)", source_type, report["skipped"])
+        elif stage.get("index") is not None:
+            # Save the updated or new index (only writers change it, and they hold _write_lock)
+            stage["index"].storage_context.persist(persist_dir=VECTORDB_PATH)
+            stage["bm25"].persist(VECTORDB_PATH)
+
+        for doc_id in vanished:
+            manifest.documents.pop(doc_id, None)
+        manifest.documents.update(new_hashes)
+        for path, state in changed_files.items():
+            manifest.files[path] = {**state, "doc_ids": file_doc_ids[path]}
+        for path in removed_files:
+            manifest.files.pop(path, None)
+        if watermark_key is not None and watermark is not None:
+            manifest.watermarks[watermark_key] = watermark
+        manifest.save()
+    if (new_hashes or vanished) and stage.get("index") is not None:
+        _publish(stage["index"], stage["bm25"])
+    stage_seconds["persist"] = time.perf_counter() - persist_start
+    for stage, seconds in stage_seconds.items():
+        INGEST_STAGE_SECONDS.labels(source_type, stage).observe(seconds)
+    report["stage_seconds"] = {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()}
+    progress("done", bytes_persisted=_persisted_bytes(VECTORDB_PATH))
+
+    logger.info(
+        "✅ Indexed %s: %d inserted, %d updated, %d skipped, %d deleted, %d nodes",
+        source_type, report["inserted"], report["updated"], report["skipped"], report["deleted"], report["nodes"]
+    )
+    return report
+
+def _load_from_storage(mmap: bool):
+    storage_context = StorageContext.from_defaults(
+        persist_dir=VECTORDB_PATH,
+        vector_store=load_vector_store(VECTORDB_PATH, mmap=mmap)
+    )
+    return load_index_from_storage(storage_context)
+
+def load_index(mmap: bool = True):
     if os.path.exists(VECTORDB_PATH):
-        storage_context = StorageContext.from_defaults(persist_dir=VECTORDB_PATH)
-        return load_index_from_storage(storage_context)
+        return _load_from_storage(mmap=mmap)
     return None
+
+# The live index of this process: a read-only snapshot (FAISS vectors memory-mapped from the
+# persisted file), replaced whole by each ingestion job.
+index_handle = IndexHandle(load_index)
+
+_bm25_index = None
+
+def _load_bm25_index(index):
+    bm25_index = BM25Index.load(VECTORDB_PATH) if VECTORDB_PATH and os.path.exists(VECTORDB_PATH) else None
+    if bm25_index is None:
+        # Indexes persisted before the BM25 index existed: build it from the stored chunks.
+        bm25_index = BM25Index()
+        if index is not None:
+            bm25_index.add(index.docstore.docs.values())
+            logger.info("🔤 Built BM25 index from %d stored chunks", len(bm25_index))
+    return bm25_index
+
+def _publish(index, bm25_index):
+    """Makes a finished job's index the one readers query: one swap, one version bump."""
+    global _bm25_index
+    if isinstance(index.vector_store, FaissVectorStore):
+        # Readers get the just-persisted FAISS file memory-mapped; the job's writable copy is dropped.
+        index = load_index(mmap=True)
+    # BM25 first: the query engine built for the new index must pick up the matching BM25 index.
+    with index_handle.lock:
+        _bm25_index = bm25_index
+    index_handle.swap(index)
+
+def get_bm25_index():
+    """The keyword index matching the live snapshot of `index_handle`."""
+    global _bm25_index
+    if _bm25_index is None:
+        index = index_handle.get()
+        with index_handle.lock:
+            if _bm25_index is None:
+                _bm25_index = _load_bm25_index(index)
+    return _bm25_index
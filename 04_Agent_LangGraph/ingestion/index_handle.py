@@ -0,0 +1,64 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class IndexHandle:
+    """
+    Process-wide owner of the live vector index.
+
+    The index is loaded from disk once. It is never changed in place: each ingestion job builds
+    its changes in a copy and publishes it with `swap()`, which bumps `version` once. Readers
+    therefore search a snapshot that no writer touches and need no lock; `lock` only guards
+    loading and swapping.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._index = None
+        self._loaded = False
+        self._version = 0
+        self._listeners = []
+        self.lock = threading.RLock()
+
+    def get(self):
+        if not self._loaded:
+            with self.lock:
+                if not self._loaded:
+                    self._index = self._loader()
+                    self._loaded = True
+                    if self._index is not None:
+                        self._version += 1
+                        logger.info("📦 Loaded vector index (version %d)", self._version)
+        return self._index
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def current(self):
+        """Returns `(index, version)` as one consistent pair."""
+        self.get()
+        with self.lock:
+            return self._index, self._version
+
+    def swap(self, index):
+        with self.lock:
+            self._index = index
+            self._loaded = True
+            self._version += 1
+            version = self._version
+        self._notify(version)
+
+    def on_change(self, callback):
+        """Registers `callback(version)` to run after every swap."""
+        self._listeners.append(callback)
+
+    def _notify(self, version: int):
+        logger.info("🔄 Vector index is now at version %d", version)
+        for callback in self._listeners:
+            try:
+                callback(version)
+            except Exception:
+                logger.exception("❌ Index change listener failed")
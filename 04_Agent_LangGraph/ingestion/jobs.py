@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from dotenv import load_dotenv
+
+from .index_builder import create_index
+from metrics import ERRORS
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+INGEST_MAX_CONCURRENT_JOBS = int(os.getenv("INGEST_MAX_CONCURRENT_JOBS", "1"))
+INGEST_MAX_QUEUED_JOBS = int(os.getenv("INGEST_MAX_QUEUED_JOBS", "20"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IngestionJob:
+    def __init__(self, source_type: str, source_path: str):
+        self.id = uuid.uuid4().hex
+        self.source_type = source_type
+        self.source_path = source_path
+        self.status = "queued"
+        self.stage = None
+        self.progress = {"documents_loaded": 0, "nodes_total": 0, "nodes_embedded": 0, "bytes_persisted": 0}
+        self.report = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel_requested = threading.Event()
+
+    def update(self, stage: str, **counters):
+        # Called by create_index at every checkpoint; raising here aborts the ingestion.
+        # Once the index is persisted ("done") the job can no longer be cancelled.
+        if stage != "done" and self._cancel_requested.is_set():
+            raise JobCancelled()
+        self.stage = stage
+        self.progress.update(counters)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "source_type": self.source_type,
+            "source_path": self.source_path,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": dict(self.progress),
+            "report": self.report,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionJobQueue:
+    """Runs `create_index` jobs on a small worker pool so ingestion can't starve agent traffic."""
+
+    def __init__(self, max_workers: int = INGEST_MAX_CONCURRENT_JOBS, max_queued: int = INGEST_MAX_QUEUED_JOBS):
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, source_type: str, source_path: str) -> IngestionJob:
+        job = IngestionJob(source_type, source_path)
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == "queued")
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} ingestion jobs are already waiting.")
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job)
+        logger.info("📥 Queued ingestion job %s (%s: %s)", job.id, source_type, source_path)
+        return job
+
+    def _prune(self):
+        finished = [jid for jid, j in self._jobs.items() if j.status in ("succeeded", "failed", "cancelled")]
+        for jid in finished[:max(0, len(finished) - INGEST_JOB_HISTORY)]:
+            del self._jobs[jid]
+
+    def _run(self, job: IngestionJob):
+        if job._cancel_requested.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.report = create_index(job.source_type, job.source_path, progress=job.update)
+            job.status = "succeeded"
+            logger.info("✅ Ingestion job %s finished in %.2fs", job.id, time.time() - job.started_at)
+        except JobCancelled:
+            job.status = "cancelled"
+            logger.info("🛑 Ingestion job %s cancelled", job.id)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.exception("❌ Ingestion job %s failed", job.id)
+            ERRORS.labels("ingestion").inc()
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.status in ("queued", "running"):
+            job._cancel_requested.set()
+            if job.future is not None and job.future.cancel():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            if job.status in ("queued", "running"):
+                job._cancel_requested.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_queue = IngestionJobQueue()
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IngestManifest:
+    """
+    Remembers what has already been embedded into the index:
+    `documents` maps a stable document id to the hash of its text,
+    `files` maps a source file to its byte hash, size, mtime and the document ids it produced,
+    `watermarks` maps an incremental source (e.g. a SQL table) to the highest row already pulled, and
+    `http_cache` maps a crawled URL to its ETag / Last-Modified validators and outgoing links.
+    """
+
+    def __init__(self, path: str, documents: dict = None, files: dict = None, watermarks: dict = None,
+                 http_cache: dict = None):
+        self.path = path
+        self.documents = documents or {}
+        self.files = files or {}
+        self.watermarks = watermarks or {}
+        self.http_cache = http_cache or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(path, data.get("documents"), data.get("files"), data.get("watermarks"), data.get("http_cache"))
+        return cls(path)
+
+    def save(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "documents": self.documents, "files": self.files,
+                "watermarks": self.watermarks, "http_cache": self.http_cache,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def changed_files(self, folder: str):
+        """
+        Splits the files directly under `folder` into (changed_or_new: {path: {hash, size, mtime}},
+        unchanged: [path], removed: [path]), where `removed` are recorded files no longer in the folder.
+        Files whose size and mtime match the manifest are taken as unchanged without being read.
+        """
+        folder = os.path.abspath(folder)
+        changed, unchanged = {}, []
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if name.startswith(".") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            known = self.files.get(path, {})
+            if known.get("size") == stat.st_size and known.get("mtime") == stat.st_mtime_ns:
+                unchanged.append(path)
+                continue
+            digest = file_hash(path)
+            if known.get("hash") == digest:
+                # Touched but identical: remember the new mtime so the next run skips hashing it.
+                known.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+                unchanged.append(path)
+            else:
+                changed[path] = {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        present = set(changed) | set(unchanged)
+        removed = [path for path in self.files if os.path.dirname(path) == folder and path not in present]
+        return changed, unchanged, removed
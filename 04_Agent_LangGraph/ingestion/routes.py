@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Body, UploadFile, File
-from .index_builder import create_index
+from fastapi import APIRouter, Body, UploadFile, File, HTTPException
+from .jobs import job_queue, JobQueueFull
 from .upload_handler import save_uploaded_file
+from .embedding_cache import get_embedding_cache
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -12,23 +13,51 @@ UPLOADED_DOCS_FOLDER = os.getenv("UPLOADED_DOCS_FOLDER")
 
 router = APIRouter()
 
+def _submit(source_type: str, source_path: str):
+    try:
+        return job_queue.submit(source_type, source_path)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
 @router.post("/create")
 def manual_ingest(source_type: str = Body(...), source_path: str = Body(...)):
-    try:
-        create_index(source_type, source_path)
-        return {"message": f"Ingested and indexed from {source_type}"}
-    except Exception as e:
-        return {"error": str(e)}
+    job = _submit(source_type, source_path)
+    return {"message": f"Queued ingestion from {source_type}", "job_id": job.id, "status": job.status}
 
 @router.post("/upload")
 def upload_and_ingest(file: UploadFile = File(...)):
     try:
         saved_path = save_uploaded_file(file)
-
-        # TODO all types
-        # Assume it's a docs ingestion
-        create_index("docs", UPLOADED_DOCS_FOLDER)
-
-        return {"message": f"Uploaded and indexed file: {file.filename}"}
     except Exception as e:
         return {"error": str(e)}
+
+    # TODO all types
+    # Assume it's a docs ingestion
+    job = _submit("docs", UPLOADED_DOCS_FOLDER)
+
+    return {"message": f"Uploaded file {file.filename}, indexing queued", "job_id": job.id, "status": job.status}
+
+@router.get("/jobs")
+def list_jobs():
+    return {"jobs": job_queue.list()}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+@router.get("/embedding-cache/stats")
+def embedding_cache_stats():
+    cache = get_embedding_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
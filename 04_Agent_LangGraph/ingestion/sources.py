@@ -1,26 +1,192 @@
-from llama_index.readers.web import SimpleWebPageReader
 from llama_index.core import SimpleDirectoryReader, Document
+from .crawler import WebsiteCrawler, parse_seeds
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import re
 import sqlite3
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
 
-def get_documents(source_type, source_path):
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+LOAD_WORKERS = int(os.getenv("LOAD_WORKERS", str(os.cpu_count() or 1)))
+LOAD_MAX_IN_FLIGHT = int(os.getenv("LOAD_MAX_IN_FLIGHT", str(2 * LOAD_WORKERS)))
+LOAD_PARALLEL_MIN_FILES = int(os.getenv("LOAD_PARALLEL_MIN_FILES", "4"))
+SQL_FAQ_TABLE = os.getenv("SQL_FAQ_TABLE", "faq")
+# A single SELECT returning the id column plus `question` and `answer` (and the watermark column, if set).
+SQL_FAQ_QUERY = os.getenv("SQL_FAQ_QUERY")
+SQL_ID_COLUMN = os.getenv("SQL_ID_COLUMN", "id")
+# An `updated_at`-style column enables incremental reads. Without one (or with the id column, which
+# never changes when a row is edited) every ingestion reads all rows and re-embeds only the edited ones.
+SQL_WATERMARK_COLUMN = os.getenv("SQL_WATERMARK_COLUMN", "")
+SQL_FETCH_BATCH = int(os.getenv("SQL_FETCH_BATCH", "500"))
+
+_load_pool = None
+_load_pool_lock = threading.Lock()
+
+def _load_file(path):
+    # Runs in a worker process; must stay a module-level function so it can be pickled.
+    return SimpleDirectoryReader(input_files=[path], filename_as_id=True).load_data()
+
+def get_load_pool():
+    """Process pool that parses files for every ingestion; started on first use and kept for the
+    life of the process, so workers pay their start-up imports once."""
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is None:
+            # "spawn" keeps worker processes independent of the server's threads and open handles.
+            context = multiprocessing.get_context("spawn")
+            _load_pool = ProcessPoolExecutor(max_workers=LOAD_WORKERS, mp_context=context)
+        return _load_pool
+
+def shutdown_load_pool():
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is not None:
+            _load_pool.shutdown(wait=True, cancel_futures=True)
+            _load_pool = None
+
+def _discard_broken_pool(executor):
+    # A crashed worker breaks the whole pool; the next ingestion starts a fresh one.
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is executor:
+            _load_pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _iter_files(files):
+    """Parses files in the shared process pool, yielding documents as files finish and keeping at
+    most LOAD_MAX_IN_FLIGHT files parsed-but-unconsumed at any time."""
+    if len(files) < LOAD_PARALLEL_MIN_FILES or LOAD_WORKERS <= 1:
+        for path in files:
+            yield from _load_file(path)
+        return
+
+    executor = get_load_pool()
+    remaining = iter(files)
+    pending = set()
+    try:
+        while True:
+            while len(pending) < LOAD_MAX_IN_FLIGHT:
+                path = next(remaining, None)
+                if path is None:
+                    break
+                pending.add(executor.submit(_load_file, path))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    except BrokenProcessPool:
+        _discard_broken_pool(executor)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+def _quote_identifier(name, setting):
+    if not _IDENTIFIER.fullmatch(name or ""):
+        raise ValueError(f"{setting}={name!r} is not a valid SQL identifier.")
+    return f'"{name}"'
+
+def _sql_source():
+    """The configured FAQ query and its quoted id / watermark columns (watermark None without incremental reads)."""
+    id_column = _quote_identifier(SQL_ID_COLUMN, "SQL_ID_COLUMN")
+    if SQL_FAQ_QUERY:
+        query = SQL_FAQ_QUERY.strip().rstrip(";")
+        if not re.match(r"(?is)(select|with)\b", query) or ";" in query:
+            raise ValueError("SQL_FAQ_QUERY must be a single SELECT statement.")
+    else:
+        query = f"SELECT rowid AS id, question, answer FROM {_quote_identifier(SQL_FAQ_TABLE, 'SQL_FAQ_TABLE')}"
+    watermark_column = None
+    if SQL_WATERMARK_COLUMN and SQL_WATERMARK_COLUMN != SQL_ID_COLUMN:
+        watermark_column = _quote_identifier(SQL_WATERMARK_COLUMN, "SQL_WATERMARK_COLUMN")
+    return query, id_column, watermark_column
+
+def _connect_read_only(source_path):
+    return sqlite3.connect(f"{Path(source_path).resolve().as_uri()}?mode=ro", uri=True)
+
+def sql_doc_id_prefix(source_path):
+    return f"sql:{source_path}:{SQL_FAQ_TABLE}:"
+
+def is_legacy_sql_doc_id(source_path, doc_id):
+    """Ids from before row-id keying were `sql:{path}:{question hash}`, without the table segment."""
+    base = f"sql:{source_path}:"
+    return doc_id.startswith(base) and ":" not in doc_id[len(base):]
+
+def sql_watermark_key(source_path):
+    """Manifest key of the table's high-water mark, or None when rows are not read incrementally."""
+    if not SQL_WATERMARK_COLUMN or SQL_WATERMARK_COLUMN == SQL_ID_COLUMN:
+        return None
+    return f"sql:{source_path}:{SQL_FAQ_TABLE}:{SQL_WATERMARK_COLUMN}"
+
+def _fetch_batches(cursor):
+    while True:
+        rows = cursor.fetchmany(SQL_FETCH_BATCH)
+        if not rows:
+            return
+        yield from rows
+
+def _iter_sql_documents(source_path, since=None):
+    prefix = sql_doc_id_prefix(source_path)
+    faq_query, id_column, watermark_column = _sql_source()
+    conn = _connect_read_only(source_path)
+    try:
+        query = f"SELECT {id_column}, question, answer, {watermark_column or 'NULL'} FROM ({faq_query})"
+        if since is not None and watermark_column:
+            cursor = conn.execute(f"{query} WHERE {watermark_column} > ? ORDER BY {watermark_column}", (since,))
+        else:
+            cursor = conn.execute(f"{query} ORDER BY {watermark_column or id_column}")
+
+        for row_id, q, a, watermark in _fetch_batches(cursor):
+            if q and a:
+                yield Document(
+                    text=f"Q: {q.strip()}\nA: {a.strip()}",
+                    id_=f"{prefix}{row_id}",
+                    metadata={"source": "sql", "row_id": row_id, "watermark": watermark},
+                    excluded_embed_metadata_keys=["source", "row_id", "watermark"],
+                    excluded_llm_metadata_keys=["watermark"],
+                )
+    finally:
+        conn.close()
+
+def sql_doc_ids(source_path):
+    """Ids of all documents the SQL source currently holds (streams only the id column)."""
+    prefix = sql_doc_id_prefix(source_path)
+    faq_query, id_column, _ = _sql_source()
+    conn = _connect_read_only(source_path)
+    try:
+        cursor = conn.execute(
+            f"SELECT {id_column} FROM ({faq_query}) WHERE question IS NOT NULL AND question != '' AND answer IS NOT NULL AND answer != ''"
+        )
+        return {f"{prefix}{row_id}" for (row_id,) in _fetch_batches(cursor)}
+    finally:
+        conn.close()
+
+def iter_documents(source_type, source_path, input_files=None, since=None, crawler=None):
+    """Yields the documents of a source one at a time; every document gets a stable id so
+    re-ingesting a source upserts instead of duplicating."""
     if source_type == "website":
-        return SimpleWebPageReader().load_data(urls=[source_path])
+        # `source_path` holds seed URLs or a sitemap; pass a `crawler` to reuse its HTTP cache.
+        crawler = crawler or WebsiteCrawler(parse_seeds(source_path), http_cache={})
+        yield from crawler.run()
     
     elif source_type == "docs":
-        return SimpleDirectoryReader(source_path).load_data()
+        if input_files is None:
+            input_files = [str(path) for path in SimpleDirectoryReader(source_path).input_files]
+        yield from _iter_files(list(input_files))
     
     elif source_type == "sql":
-        conn = sqlite3.connect(source_path)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT question, answer FROM faq")
-        rows = cursor.fetchall()
-        conn.close()
-
-        return [
-            Document(text=f"Q: {q.strip()}\nA: {a.strip()}")
-            for q, a in rows if q and a
-        ]
+        # Rows are streamed in SQL_FETCH_BATCH chunks; with `since` (and a watermark column) only rows past it are read.
+        yield from _iter_sql_documents(source_path, since=since)
 
     else:
         raise ValueError("Unsupported source type")
+
+def get_documents(source_type, source_path, input_files=None, since=None, crawler=None):
+    return list(iter_documents(source_type, source_path, input_files=input_files, since=since, crawler=crawler))
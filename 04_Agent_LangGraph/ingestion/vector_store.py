@@ -0,0 +1,249 @@
+from typing import Any, List, Sequence
+import json
+import logging
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+import faiss
+import numpy as np
+from pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+env_path = Path(__file__).resolve().parents[1]/'.env'
+load_dotenv(dotenv_path=env_path)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "simple").lower()
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "80"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "1024"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+# Tombstoned share of the index above which it is rebuilt on persist.
+FAISS_COMPACT_RATIO = float(os.getenv("FAISS_COMPACT_RATIO", "0.2"))
+# Queries fetch at most this many times top_k to skip over tombstones.
+FAISS_MAX_OVERFETCH = int(os.getenv("FAISS_MAX_OVERFETCH", "4"))
+
+FAISS_BACKENDS = {"faiss_flat": "flat", "faiss_hnsw": "hnsw", "faiss_ivf": "ivf"}
+FAISS_INDEX_FNAME = "default__vector_store.faiss"
+FAISS_IDS_FNAME = "default__vector_store.ids.json"
+
+logger = logging.getLogger(__name__)
+
+
+class FaissVectorStore(BasePydanticVectorStore):
+    """
+    LlamaIndex vector store on a FAISS index (flat, HNSW or IVF, inner product on normalized vectors).
+
+    The index is persisted in FAISS's native binary format next to a small id map and can be
+    memory-mapped on load. Node texts stay in the LlamaIndex docstore. Flat indexes delete with
+    `remove_ids`; HNSW and IVF use tombstones (filtered at query time), since HNSW cannot remove
+    vectors and IVF does not renumber the ids `IndexIDMap2` maps. On persist, the index is rebuilt from
+    its stored vectors when tombstones pass `compact_ratio` of it or, for IVF, when it has outgrown
+    the data it was trained on.
+    """
+
+    stores_text: bool = False
+    kind: str = "hnsw"
+    hnsw_m: int = FAISS_HNSW_M
+    ef_construction: int = FAISS_EF_CONSTRUCTION
+    ef_search: int = FAISS_EF_SEARCH
+    ivf_nlist: int = FAISS_IVF_NLIST
+    nprobe: int = FAISS_NPROBE
+    compact_ratio: float = FAISS_COMPACT_RATIO
+    max_overfetch: int = FAISS_MAX_OVERFETCH
+
+    _index: Any = PrivateAttr(default=None)
+    _node_ids: dict = PrivateAttr(default_factory=dict)      # faiss id -> node id
+    _ref_doc_ids: dict = PrivateAttr(default_factory=dict)   # ref doc id -> [faiss ids]
+    _deleted: set = PrivateAttr(default_factory=set)         # tombstoned faiss ids
+    _next_id: int = PrivateAttr(default=0)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FaissVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self._node_ids) - len(self._deleted)
+
+    def _new_index(self, vectors: np.ndarray):
+        dim = vectors.shape[1]
+        if self.kind == "flat":
+            base = faiss.IndexFlatIP(dim)
+        elif self.kind == "hnsw":
+            base = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efConstruction = self.ef_construction
+        elif self.kind == "ivf":
+            # IVF needs training data; with a small first batch use fewer lists.
+            nlist = max(1, min(self.ivf_nlist, len(vectors) // 39))
+            quantizer = faiss.IndexFlatIP(dim)
+            base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            base.train(vectors)
+        else:
+            raise ValueError(f"Unsupported FAISS index kind '{self.kind}'. Use flat, hnsw or ivf.")
+        index = faiss.IndexIDMap2(base)
+        self._apply_search_params(index)
+        return index
+
+    def _apply_search_params(self, index):
+        base = faiss.downcast_index(index.index)
+        if isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = self.ef_search
+        elif isinstance(base, faiss.IndexIVF):
+            base.nprobe = self.nprobe
+
+    @staticmethod
+    def _as_matrix(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype="float32")
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        vectors = np.ascontiguousarray(vectors)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        vectors = self._as_matrix([node.get_embedding() for node in nodes])
+        if self._index is None:
+            self._index = self._new_index(vectors)
+
+        ids = np.arange(self._next_id, self._next_id + len(nodes), dtype="int64")
+        self._index.add_with_ids(vectors, ids)
+        self._next_id += len(nodes)
+
+        for faiss_id, node in zip(ids.tolist(), nodes):
+            self._node_ids[faiss_id] = node.node_id
+            if node.ref_doc_id is not None:
+                self._ref_doc_ids.setdefault(node.ref_doc_id, []).append(faiss_id)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        faiss_ids = self._ref_doc_ids.pop(ref_doc_id, [])
+        if not faiss_ids or self._index is None:
+            return
+        if self.kind == "flat":
+            self._index.remove_ids(np.asarray(faiss_ids, dtype="int64"))
+            for faiss_id in faiss_ids:
+                self._node_ids.pop(faiss_id, None)
+        else:
+            self._deleted.update(faiss_ids)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise ValueError("Metadata filters are not supported by FaissVectorStore.")
+        if self._index is None or query.query_embedding is None or len(self) == 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        k = query.similarity_top_k
+        # Over-fetch so tombstoned vectors don't eat into the top k (bounded; compaction keeps them few).
+        fetch_k = min(k + len(self._deleted), k * self.max_overfetch, self._index.ntotal)
+        scores, faiss_ids = self._index.search(self._as_matrix(query.query_embedding), fetch_k)
+
+        similarities, node_ids = [], []
+        for score, faiss_id in zip(scores[0].tolist(), faiss_ids[0].tolist()):
+            # A search racing a rebuild may still see ids whose mapping was just dropped.
+            node_id = self._node_ids.get(faiss_id)
+            if faiss_id < 0 or faiss_id in self._deleted or node_id is None:
+                continue
+            similarities.append(score)
+            node_ids.append(node_id)
+            if len(node_ids) == k:
+                break
+        return VectorStoreQueryResult(similarities=similarities, ids=node_ids)
+
+    def _rebuild(self, reason: str):
+        """Replaces the index with a fresh one (trained on all live vectors) without the tombstoned ids."""
+        base = faiss.downcast_index(self._index.index)
+        vectors = base.reconstruct_n(0, base.ntotal)
+        ids = faiss.vector_to_array(self._index.id_map)
+        keep = np.fromiter((faiss_id not in self._deleted for faiss_id in ids.tolist()), dtype=bool, count=len(ids))
+        ids, vectors = ids[keep], np.ascontiguousarray(vectors[keep])
+        index = None
+        if len(ids):
+            index = self._new_index(vectors)
+            index.add_with_ids(vectors, ids)
+        # Swapped in whole: readers still searching the old index are unaffected.
+        self._index = index
+        for faiss_id in self._deleted:
+            self._node_ids.pop(faiss_id, None)
+        self._deleted = set()
+        logger.info("🧱 Rebuilt FAISS %s index with %d vectors (%s)", self.kind, len(ids), reason)
+
+    def _maintain(self):
+        if self._index is None:
+            return
+        base = faiss.downcast_index(self._index.index)
+        # Trained on a first, possibly tiny batch; retrain once the data supports twice as many lists.
+        if isinstance(base, faiss.IndexIVF) and min(self.ivf_nlist, len(self) // 39) >= 2 * base.nlist:
+            self._rebuild(f"retrained, {base.nlist} lists were too few")
+        elif self._deleted and len(self._deleted) > self.compact_ratio * self._index.ntotal:
+            self._rebuild(f"compacted {len(self._deleted)} deleted vectors")
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        persist_dir = os.path.dirname(persist_path)
+        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+        self._maintain()
+        index_path = os.path.join(persist_dir, FAISS_INDEX_FNAME)
+        if self._index is not None:
+            # Written aside and renamed over the old file: the live index keeps its mapping of the old one.
+            faiss.write_index(self._index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+        with open(os.path.join(persist_dir, FAISS_IDS_FNAME), "w", encoding="utf-8") as f:
+            json.dump({
+                "kind": self.kind,
+                "next_id": self._next_id,
+                "node_ids": list(self._node_ids.items()),
+                "ref_doc_ids": self._ref_doc_ids,
+                "deleted": sorted(self._deleted),
+            }, f)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, mmap: bool = False) -> "FaissVectorStore":
+        with open(os.path.join(persist_dir, FAISS_IDS_FNAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        store = cls(kind=data["kind"])
+        index_path = os.path.join(persist_dir, FAISS_INDEX_FNAME)
+        if os.path.exists(index_path):
+            if mmap:
+                try:
+                    store._index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError:
+                    logger.warning("⚠️ FAISS index type does not support mmap, reading it into memory.")
+                    store._index = faiss.read_index(index_path)
+            else:
+                store._index = faiss.read_index(index_path)
+            store._apply_search_params(store._index)
+
+        store._next_id = data["next_id"]
+        store._node_ids = {int(faiss_id): node_id for faiss_id, node_id in data["node_ids"]}
+        store._ref_doc_ids = data["ref_doc_ids"]
+        store._deleted = set(data["deleted"])
+        return store
+
+
+def build_vector_store(backend: str = VECTOR_STORE_BACKEND) -> BasePydanticVectorStore:
+    if backend == "simple":
+        return SimpleVectorStore()
+    if backend in FAISS_BACKENDS:
+        return FaissVectorStore(kind=FAISS_BACKENDS[backend])
+    raise ValueError(f"Unsupported VECTOR_STORE_BACKEND '{backend}'. Use simple, {', '.join(FAISS_BACKENDS)}.")
+
+
+def load_vector_store(persist_dir: str, mmap: bool = False) -> BasePydanticVectorStore:
+    # The backend an index was created with wins over the current setting.
+    if os.path.exists(os.path.join(persist_dir, FAISS_IDS_FNAME)):
+        return FaissVectorStore.from_persist_dir(persist_dir, mmap=mmap)
+    return SimpleVectorStore.from_persist_dir(persist_dir)
@@ -47,9 +47,16 @@ def setup_logging():
 
             # Your internal app modules
             "agents": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.admission": {"handlers": ["console"], "level": log_level, "propagate": False},
             "agents.agent_loader": {"handlers": ["console"], "level": log_level, "propagate": False},
             "agents.graph_builder": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.history_window": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.reranker": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.retrieval_cache": {"handlers": ["console"], "level": log_level, "propagate": False},
             "agents.routes": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.session_store": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.tool_executor": {"handlers": ["console"], "level": log_level, "propagate": False},
+            "agents.tool_guard": {"handlers": ["console"], "level": log_level, "propagate": False},
             "agents.tools": {"handlers": ["console"], "level": log_level, "propagate": False},
 
             # Noisy third-party libraries
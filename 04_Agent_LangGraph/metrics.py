@@ -0,0 +1,72 @@
+import os
+from contextlib import contextmanager
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+# Latency buckets (seconds): local retrieval work is sub-millisecond, LLM runs take seconds.
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=SLOW_BUCKETS
+)
+GRAPH_RUN_SECONDS = Histogram(
+    "agent_graph_run_duration_seconds", "Full LangGraph run per agent turn", ["model", "mode"], buckets=SLOW_BUCKETS
+)
+LLM_CALL_SECONDS = Histogram(
+    "agent_llm_call_duration_seconds", "Single LLM call of the agent", ["model"], buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens used by the agent", ["model", "kind"])
+TOOL_CALL_SECONDS = Histogram(
+    "agent_tool_call_duration_seconds", "Single tool call", ["tool", "status"], buckets=SLOW_BUCKETS
+)
+TOOL_STEP_SECONDS = Histogram(
+    "agent_tool_step_duration_seconds", "All tool calls of one agent step", buckets=SLOW_BUCKETS
+)
+RETRIEVAL_SECONDS = Histogram(
+    "rag_retrieval_duration_seconds", "Candidate retrieval for vector_retriever", ["mode"], buckets=FAST_BUCKETS
+)
+RERANK_SECONDS = Histogram(
+    "rag_rerank_duration_seconds", "Reranking of retrieved candidates", ["reranker"], buckets=FAST_BUCKETS
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_duration_seconds", "Time an ingestion spent in each stage", ["source_type", "stage"], buckets=SLOW_BUCKETS
+)
+EMBED_BATCH_SECONDS = Histogram(
+    "ingest_embed_batch_duration_seconds", "One embedding request during ingestion", buckets=SLOW_BUCKETS
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+ERRORS = Counter("errors_total", "Errors by component", ["component"])
+# "livesum": with several workers, /metrics reports the sum over the live worker processes.
+ADMISSION_IN_FLIGHT = Gauge(
+    "agent_admission_in_flight", "Agent turns running", multiprocess_mode="livesum"
+)
+ADMISSION_QUEUED = Gauge(
+    "agent_admission_queued", "Agent turns waiting for admission", multiprocess_mode="livesum"
+)
+ADMISSION_MODEL_IN_FLIGHT = Gauge(
+    "agent_admission_model_in_flight", "Agent turns running per model", ["model"], multiprocess_mode="livesum"
+)
+
+
+@contextmanager
+def observe(histogram, **labels):
+    """Times the block into `histogram` (with `labels`), also when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    """Returns `(body, content_type)` for `/metrics`, merging all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from agents.admission import AdmissionController, AdmissionRejected
+
+MODEL = "openai:gpt-4o-mini"
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queued=0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("a", MODEL)
+        return controller, rejected.value
+
+    controller, error = asyncio.run(scenario())
+    assert error.retry_after >= 1
+    assert controller.rejected == 1
+    assert controller.queued == 0
+
+
+def test_turn_waiting_past_the_queue_timeout_is_rejected_and_releases_nothing():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queued=4, queue_timeout=0.05)
+        admission = await controller.acquire("a", MODEL)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("b", MODEL)
+        stats_while_running = controller.stats()
+        admission.release()
+        admission.release()
+        return controller, stats_while_running
+
+    controller, running = asyncio.run(scenario())
+    assert running["in_flight"] == 1
+    assert controller.timed_out == 1
+    assert controller.stats()["in_flight"] == 0
+    assert controller.stats()["active_sessions"] == 0
+
+
+def test_model_limit_queues_turns_of_a_saturated_model_only():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queued=4, queue_timeout=0.05,
+                                         model_limits={"groq:slow": 1})
+        first = await controller.acquire("a", "groq:slow")
+        other_model = await controller.acquire("b", MODEL)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("c", "groq:slow")
+        first.release()
+        other_model.release()
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.admitted == 2
+    assert controller.timed_out == 1
+
+
+def test_turns_of_one_session_run_one_at_a_time():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queued=4, queue_timeout=1)
+        first = await controller.acquire("same", MODEL)
+        second = asyncio.create_task(controller.acquire("same", MODEL))
+        await asyncio.sleep(0.02)
+        waited = not second.done()
+        first.release()
+        (await second).release()
+        return waited
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,67 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import agents.agent_loader as loader
+import agents.graph_builder as graph_builder
+import agents.routes as routes
+from agents.admission import AdmissionController
+from agents.graph_builder import GraphBuilder
+from benchmarks.fakes import FakeChatModel, FakeSearchTool
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    # The compiled graph is shared by the process; rebuild it around the fake tool for each test.
+    monkeypatch.setattr(graph_builder, "_graph", None)
+    monkeypatch.setattr(graph_builder, "_graph_with_memory", None)
+    monkeypatch.setattr(graph_builder, "get_tools", lambda: [FakeSearchTool()])
+    monkeypatch.setattr(GraphBuilder, "_init_llm", lambda self, t, n: FakeChatModel(tool_calls=["fake_search"]))
+    agent = GraphBuilder()
+    monkeypatch.setattr(loader, "get_agent", lambda model_config=loader.DEFAULT_MODEL: agent)
+    return agent
+
+
+@pytest.fixture
+def client(agent, monkeypatch):
+    monkeypatch.setattr(routes, "admission_controller", AdmissionController(max_concurrent=4, max_queued=4))
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+
+def test_invoke_runs_the_graph_and_its_tool_calls(client):
+    response = client.post("/agent/invoke", json={"input": "What is RAG?", "session_id": "invoke"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["final_output"] == "This is a fake answer."
+    assert body["tools_used"] == ["fake_search"]
+    assert {"tool": "fake_search", "type": "text", "data": "Result for: What is RAG?"} in body["retrieved_chunks"]
+
+
+def test_invoke_returns_only_the_current_turn_unless_history_is_requested(client):
+    client.post("/agent/invoke", json={"input": "first", "session_id": "history"})
+
+    turn = client.post("/agent/invoke", json={"input": "second", "session_id": "history", "include_history": "false"})
+    full = client.post("/agent/invoke", json={"input": "third", "session_id": "history", "include_history": True})
+
+    def human_turns(response):
+        return [step["content"] for step in response.json()["intermediate_steps"] if step["type"] == "human"]
+
+    assert human_turns(turn) == ["second"]
+    assert human_turns(full) == ["first", "second", "third"]
+
+
+def test_invoke_rejects_an_invalid_boolean(client):
+    response = client.post("/agent/invoke", json={"input": "hi", "include_history": "maybe"})
+    assert response.status_code == 400
+
+
+def test_invoke_answers_429_with_retry_after_when_admission_is_full(client, monkeypatch):
+    monkeypatch.setattr(routes, "admission_controller", AdmissionController(max_queued=0))
+
+    response = client.post("/agent/invoke", json={"input": "hi", "session_id": "busy"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+
+from ingestion.crawler import WebsiteCrawler, website_doc_id
+
+SITE = "http://site.test"
+
+PAGES = {
+    "/": ["/a", "/b", "/gone", "http://other.test/x"],
+    "/a": ["/a1"],
+    "/b": [],
+    "/a1": [],
+}
+
+
+def html(links):
+    return "<html><body>" + "".join(f'<a href="{link}">{link}</a>' for link in links) + "</body></html>"
+
+
+class Site:
+    """Stand-in website served through `httpx.MockTransport`; records requests and peak concurrency."""
+
+    def __init__(self, etags=None):
+        self.etags = etags or {}
+        self.requested = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requested.append(str(request.url))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            path = request.url.path
+            if request.url.host != "site.test":
+                return httpx.Response(200, headers={"content-type": "text/html"}, text=html([]))
+            if path == "/gone":
+                return httpx.Response(410)
+            if path not in PAGES:
+                return httpx.Response(404)
+            etag = self.etags.get(path)
+            if etag and request.headers.get("if-none-match") == etag:
+                return httpx.Response(304)
+            headers = {"content-type": "text/html", **({"etag": etag} if etag else {})}
+            return httpx.Response(200, headers=headers, text=html(PAGES[path]))
+        finally:
+            self.in_flight -= 1
+
+    def crawler(self, http_cache=None, known_urls=frozenset(), **kwargs):
+        kwargs.setdefault("max_depth", 2)
+        kwargs.setdefault("max_pages", 100)
+        return WebsiteCrawler(
+            [f"{SITE}/"], http_cache=http_cache if http_cache is not None else {}, known_urls=known_urls,
+            transport=httpx.MockTransport(self.handle), **kwargs
+        )
+
+
+def urls(crawler):
+    return {doc.metadata["url"] for doc in crawler.documents}
+
+
+def test_depth_cap_stops_following_links():
+    crawler = Site().crawler(max_depth=1)
+    crawler.run()
+    assert urls(crawler) == {f"{SITE}/", f"{SITE}/a", f"{SITE}/b"}
+
+
+def test_page_cap_limits_fetches():
+    site = Site()
+    crawler = site.crawler(max_pages=2)
+    crawler.run()
+    assert len(site.requested) == 2
+
+
+def test_links_to_other_hosts_are_not_followed():
+    site = Site()
+    site.crawler().run()
+    assert all(url.startswith(SITE) for url in site.requested)
+
+
+def test_per_host_limit_caps_concurrent_requests():
+    site = Site()
+    site.crawler(max_depth=1, per_host=2, concurrency=16).run()
+    assert site.peak == 2
+
+
+def test_not_modified_page_is_unchanged_and_its_links_are_followed():
+    site = Site(etags={"/": '"v1"'})
+    http_cache = {f"{SITE}/": {"etag": '"v1"', "last_modified": None, "links": [f"{SITE}/a"]}}
+    crawler = site.crawler(http_cache=http_cache, known_urls={website_doc_id(f"{SITE}/")}, max_depth=1)
+    crawler.run()
+    assert crawler.unchanged == {f"{SITE}/"}
+    assert urls(crawler) == {f"{SITE}/a"}
+
+
+def test_gone_pages_are_reported_and_dropped_from_the_http_cache():
+    http_cache = {f"{SITE}/gone": {"etag": None, "last_modified": None, "links": []}}
+    crawler = Site().crawler(http_cache=http_cache, known_urls={website_doc_id(f"{SITE}/gone")})
+    crawler.run()
+    assert crawler.gone == {f"{SITE}/gone"}
+    assert f"{SITE}/gone" not in http_cache
+
+
+def test_known_pages_no_longer_linked_are_unlinked():
+    old = f"{SITE}/old"
+    http_cache = {old: {"etag": None, "last_modified": None, "links": []}}
+    crawler = Site().crawler(http_cache=http_cache, known_urls={website_doc_id(old), website_doc_id("http://other.test/y")})
+    crawler.run()
+    assert crawler.unlinked == {old}
+    assert old not in http_cache
+
+
+def test_truncated_crawl_does_not_unlink_pages():
+    crawler = Site().crawler(known_urls={website_doc_id(f"{SITE}/a1")}, max_pages=2)
+    crawler.run()
+    assert crawler.unlinked == set()
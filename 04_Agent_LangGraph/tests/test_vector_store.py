@@ -0,0 +1,96 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from ingestion.vector_store import FaissVectorStore, load_vector_store
+
+DIM = 16
+
+
+def nodes(doc_id, count, rng):
+    vectors = rng.standard_normal((count, DIM)).astype("float32")
+    return [
+        TextNode(
+            id_=f"{doc_id}-{i}", text="", embedding=vector.tolist(),
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc_id)},
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def query_ids(store, embedding, k=10):
+    return store.query(VectorStoreQuery(query_embedding=list(embedding), similarity_top_k=k)).ids
+
+
+def nlist(store):
+    return faiss.downcast_index(store.client.index).nlist
+
+
+def persist(store, persist_dir):
+    store.persist(os.path.join(persist_dir, "default__vector_store.json"))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_flat_delete_removes_vectors(rng):
+    store = FaissVectorStore(kind="flat")
+    kept, dropped = nodes("kept", 3, rng), nodes("dropped", 3, rng)
+    store.add(kept + dropped)
+
+    store.delete("dropped")
+
+    assert store.client.ntotal == 3
+    assert len(store) == 3
+    assert set(query_ids(store, dropped[0].embedding)) == {node.node_id for node in kept}
+
+
+@pytest.mark.parametrize("kind", ["hnsw", "ivf"])
+def test_tombstoned_vectors_are_skipped_and_compacted_on_persist(kind, rng, tmp_path):
+    store = FaissVectorStore(kind=kind, compact_ratio=0.2)
+    kept, dropped = nodes("kept", 50, rng), nodes("dropped", 50, rng)
+    store.add(kept + dropped)
+
+    store.delete("dropped")
+
+    assert store.client.ntotal == 100
+    assert not set(query_ids(store, dropped[0].embedding)) & {node.node_id for node in dropped}
+
+    persist(store, tmp_path)
+
+    assert store.client.ntotal == 50
+    reloaded = load_vector_store(str(tmp_path))
+    assert reloaded.client.ntotal == 50
+    assert len(reloaded) == 50
+    assert query_ids(reloaded, kept[0].embedding, k=1) == [kept[0].node_id]
+
+
+def test_tombstones_below_the_ratio_are_kept(rng, tmp_path):
+    store = FaissVectorStore(kind="hnsw", compact_ratio=0.5)
+    store.add(nodes("kept", 8, rng) + nodes("dropped", 2, rng))
+    store.delete("dropped")
+
+    persist(store, tmp_path)
+
+    assert store.client.ntotal == 10
+    assert len(load_vector_store(str(tmp_path))) == 8
+
+
+def test_ivf_is_retrained_once_it_outgrows_its_first_batch(rng, tmp_path):
+    store = FaissVectorStore(kind="ivf", ivf_nlist=8)
+    store.add(nodes("first", 40, rng))
+    assert nlist(store) == 1
+
+    store.add(nodes("second", 700, rng))
+    persist(store, tmp_path)
+
+    assert nlist(store) == 8
+    assert store.client.ntotal == 740
+    reloaded = load_vector_store(str(tmp_path))
+    assert len(reloaded) == 740
@@ -0,0 +1,52 @@
+import os
+import logging
+from pathlib import Path
+from dotenv import load_dotenv
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+load_dotenv()
+# none (default), otlp (OTEL_EXPORTER_OTLP_ENDPOINT, gRPC), console or file (TRACING_FILE_PATH, one JSON span per line).
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "./data/traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "langgraph-agent-api")
+
+logger = logging.getLogger(__name__)
+
+
+def _build_exporter(kind: str):
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        Path(TRACING_FILE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        return ConsoleSpanExporter(
+            out=open(TRACING_FILE_PATH, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    raise ValueError(f"Unsupported TRACING_EXPORTER: {kind}")
+
+
+def setup_tracing(app=None, kind: str = TRACING_EXPORTER):
+    """
+    Installs the global tracer provider and instruments the FastAPI `app`. Modules create
+    spans through `trace.get_tracer(__name__)`, which stays a no-op while tracing is off.
+    """
+    if kind == "none":
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter(kind)))
+    trace.set_tracer_provider(provider)
+
+    if app is not None:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics")
+
+    logger.info("🔭 Tracing enabled (%s exporter)", kind)
+    return provider